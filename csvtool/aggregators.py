@@ -1,35 +1,81 @@
 """Утилиты агрегации для csvtool."""
 from __future__ import annotations
 
+import base64
+import hashlib
+import math
+import random
 import re
 from decimal import Decimal, InvalidOperation
-from statistics import mean
-from typing import Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, TypeVar, Union, cast
 
-__all__ = ["apply_aggregate"]
+__all__ = ["apply_aggregate", "parse_aggregate", "AggregateState"]
 
 _AGG_RE = re.compile(r"(?P<column>[\w\s]+)=(?P<func>\w+)")
+_QUANTILE_RE = re.compile(r"approx_p(?P<pct>\d{1,2})")
+
+# z-значение для 95% доверительного интервала в режиме --sample
+_Z_95 = Decimal("1.96")
+# Знаков после запятой в --sample, если ширина интервала неизвестна или нулевая
+_SAMPLE_PLACES = 4
+# Зерно генератора KLL‑скетча: одинаковый файл даёт одинаковый approx_pN
+_KLL_SEED = 0
 
 
 class AggregationError(ValueError):
     """Ошибки вычисления агрегаций."""
 
 
+# Значение, передаваемое в .combine(): Decimal или исходная строка (numeric = False)
+_Value = Union[Decimal, str]
+_AggregatorT = TypeVar("_AggregatorT", bound="_Aggregator")
+
+
 class _Aggregator:
     """Базовый агрегатор.
 
-    В дочерних классах должны быть реализованы .combine(value) и .result() методы.
+    В дочерних классах должны быть реализованы .combine(value), .merge(other)
+    и .result() методы, а также .dump()/.load(data) для сохранения состояния
+    в JSON. Если numeric = False, в .combine() передаётся исходная строка без
+    преобразования в Decimal.
     """
 
     name: str
+    numeric: bool = True
+
+    def combine(self, value: _Value) -> None:
+        raise NotImplementedError
 
-    def combine(self, value: Decimal) -> None:
+    def merge(self, other: "_Aggregator") -> None:
+        """Объединяет с частичным состоянием other того же типа."""
         raise NotImplementedError
 
+    def _same_kind(self: _AggregatorT, other: "_Aggregator") -> _AggregatorT:
+        """Возвращает other, если это агрегатор того же класса, что и self."""
+        if type(other) is not type(self):
+            raise AggregationError("Нельзя объединить состояния разных агрегаторов.")
+        return cast(_AggregatorT, other)
+
     def result(self) -> Decimal:
         """Возвращает результат агрегации."""
         raise NotImplementedError
 
+    def dump(self) -> Dict[str, Any]:
+        """Возвращает состояние в виде JSON‑совместимого словаря."""
+        raise NotImplementedError
+
+    def load(self, data: Dict[str, Any]) -> None:
+        """Восстанавливает состояние, сохранённое .dump()."""
+        raise NotImplementedError
+
+
+def _dump_decimal(value: Optional[Decimal]) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _load_decimal(value: Optional[str]) -> Optional[Decimal]:
+    return None if value is None else Decimal(value)
+
 
 class _Min(_Aggregator):
     name = "min"
@@ -37,9 +83,21 @@ class _Min(_Aggregator):
     def __init__(self) -> None:
         self._min: Optional[Decimal] = None
 
-    def combine(self, value: Decimal) -> None:
+    def combine(self, value: _Value) -> None:
+        value = cast(Decimal, value)
         self._min = value if self._min is None or value < self._min else self._min
 
+    def merge(self, other: _Aggregator) -> None:
+        other = self._same_kind(other)
+        if other._min is not None:
+            self.combine(other._min)
+
+    def dump(self) -> Dict[str, Any]:
+        return {"min": _dump_decimal(self._min)}
+
+    def load(self, data: Dict[str, Any]) -> None:
+        self._min = _load_decimal(data["min"])
+
     def result(self) -> Decimal:
         if self._min is None:
             raise AggregationError("Нет данных для вычисления min.")
@@ -52,9 +110,21 @@ class _Max(_Aggregator):
     def __init__(self) -> None:
         self._max: Optional[Decimal] = None
 
-    def combine(self, value: Decimal) -> None:
+    def combine(self, value: _Value) -> None:
+        value = cast(Decimal, value)
         self._max = value if self._max is None or value > self._max else self._max
 
+    def merge(self, other: _Aggregator) -> None:
+        other = self._same_kind(other)
+        if other._max is not None:
+            self.combine(other._max)
+
+    def dump(self) -> Dict[str, Any]:
+        return {"max": _dump_decimal(self._max)}
+
+    def load(self, data: Dict[str, Any]) -> None:
+        self._max = _load_decimal(data["max"])
+
     def result(self) -> Decimal:
         if self._max is None:
             raise AggregationError("Нет данных для вычисления max.")
@@ -65,20 +135,242 @@ class _Avg(_Aggregator):
     name = "avg"
 
     def __init__(self) -> None:
-        self._values: List[Decimal] = []
+        self._sum = Decimal(0)
+        self._count = 0
+
+    def combine(self, value: _Value) -> None:
+        self._sum += cast(Decimal, value)
+        self._count += 1
+
+    def merge(self, other: _Aggregator) -> None:
+        other = self._same_kind(other)
+        self._sum += other._sum
+        self._count += other._count
+
+    def result(self) -> Decimal:
+        if not self._count:
+            raise AggregationError("Нет данных для вычисления avg.")
+        return self._sum / self._count
+
+    def dump(self) -> Dict[str, Any]:
+        return {"sum": str(self._sum), "count": self._count}
+
+    def load(self, data: Dict[str, Any]) -> None:
+        self._sum = Decimal(data["sum"])
+        self._count = int(data["count"])
+
+
+class _ApproxDistinct(_Aggregator):
+    """Приближённое число уникальных значений (HyperLogLog).
+
+    Хранит 2**precision однобайтовых регистров, стандартная ошибка
+    оценки ~1.04 / sqrt(2**precision) (≈1.6% при precision=12).
+    """
+
+    name = "approx_distinct"
+    numeric = False
+
+    def __init__(self, precision: int = 12) -> None:
+        self._p = precision
+        self._m = 1 << precision
+        self._registers = bytearray(self._m)
+
+    def combine(self, value: _Value) -> None:
+        digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+        x = int.from_bytes(digest, "big")
+        idx = x >> (64 - self._p)
+        rest = x & ((1 << (64 - self._p)) - 1)
+        rank = (64 - self._p) - rest.bit_length() + 1
+        if rank > self._registers[idx]:
+            self._registers[idx] = rank
+
+    def merge(self, other: _Aggregator) -> None:
+        other = self._same_kind(other)
+        if other._p != self._p:
+            raise AggregationError("Нельзя объединить HyperLogLog с разной точностью.")
+        self._registers = bytearray(map(max, self._registers, other._registers))
+
+    def dump(self) -> Dict[str, Any]:
+        return {"precision": self._p, "registers": base64.b64encode(self._registers).decode()}
+
+    def load(self, data: Dict[str, Any]) -> None:
+        registers = bytearray(base64.b64decode(data["registers"]))
+        if data["precision"] != self._p or len(registers) != self._m:
+            raise AggregationError("Несовместимое состояние approx_distinct.")
+        self._registers = registers
+
+    def result(self) -> Decimal:
+        m = self._m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        if zeros == m:
+            raise AggregationError("Нет данных для вычисления approx_distinct.")
+        # Поправка для малых мощностей: линейный подсчёт
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return Decimal(round(estimate))
+
+
+class _ApproxQuantile(_Aggregator):
+    """Приближённый квантиль (KLL‑скетч).
+
+    Память ограничена O(k) значениями независимо от числа строк; пока строк
+    меньше k, результат точный. По умолчанию вычисляет медиану, другие
+    квантили задаются через approx_pN (например, approx_p95).
+    """
 
-    def combine(self, value: Decimal) -> None:
-        self._values.append(value)
+    name = "approx_median"
+
+    def __init__(self, quantile: float = 0.5, k: int = 200) -> None:
+        if not 0 <= quantile <= 1:
+            raise AggregationError("Квантиль должен быть в диапазоне [0, 1].")
+        self._q = quantile
+        self._k = k
+        self._compactors: List[List[Decimal]] = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._rng = random.Random(_KLL_SEED)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._compactors) - level - 1
+        return int(math.ceil(self._k * (2 / 3) ** depth)) + 1
+
+    def _grow(self) -> None:
+        self._compactors.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self._compactors)))
+
+    def _compress(self) -> None:
+        for h in range(len(self._compactors)):
+            items = self._compactors[h]
+            if len(items) < self._capacity(h):
+                continue
+            if h + 1 >= len(self._compactors):
+                self._grow()
+            items.sort()
+            # нечётный элемент остаётся на текущем уровне
+            tail = [items.pop()] if len(items) % 2 else []
+            offset = self._rng.getrandbits(1)
+            self._compactors[h + 1].extend(items[offset::2])
+            self._compactors[h] = tail
+            self._size = sum(len(c) for c in self._compactors)
+            if self._size < self._max_size:
+                break
+
+    def combine(self, value: _Value) -> None:
+        self._compactors[0].append(cast(Decimal, value))
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other: _Aggregator) -> None:
+        other = self._same_kind(other)
+        while len(self._compactors) < len(other._compactors):
+            self._grow()
+        for h, items in enumerate(other._compactors):
+            self._compactors[h].extend(items)
+        self._size = sum(len(c) for c in self._compactors)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def dump(self) -> Dict[str, Any]:
+        return {"compactors": [[str(value) for value in items] for items in self._compactors]}
+
+    def load(self, data: Dict[str, Any]) -> None:
+        self._compactors = [[Decimal(value) for value in items] for items in data["compactors"]]
+        self._max_size = sum(self._capacity(h) for h in range(len(self._compactors)))
+        self._size = sum(len(c) for c in self._compactors)
 
     def result(self) -> Decimal:
-        if not self._values:
+        weighted = sorted(
+            (value, 1 << h) for h, items in enumerate(self._compactors) for value in items
+        )
+        if not weighted:
+            raise AggregationError(f"Нет данных для вычисления {self.name}.")
+        target = self._q * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+
+class _SampledAvg(_Aggregator):
+    """Среднее по случайной выборке с 95% доверительным интервалом.
+
+    Используется в режиме --sample; хранит только count, mean и сумму
+    квадратов отклонений (алгоритм Уэлфорда).
+    """
+
+    name = "avg"
+
+    def __init__(self, fraction: float = 1.0) -> None:
+        self._fraction = Decimal(str(fraction))
+        self._count = 0
+        self._mean = Decimal(0)
+        self._m2 = Decimal(0)
+
+    def combine(self, value: _Value) -> None:
+        value = cast(Decimal, value)
+        self._count += 1
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+
+    def merge(self, other: _Aggregator) -> None:
+        other = self._same_kind(other)
+        if not other._count:
+            return
+        total = self._count + other._count
+        delta = other._mean - self._mean
+        self._m2 += other._m2 + delta * delta * self._count * other._count / total
+        self._mean += delta * other._count / total
+        self._count = total
+
+    def dump(self) -> Dict[str, Any]:
+        return {"count": self._count, "mean": str(self._mean), "m2": str(self._m2)}
+
+    def load(self, data: Dict[str, Any]) -> None:
+        self._count = int(data["count"])
+        self._mean = Decimal(data["mean"])
+        self._m2 = Decimal(data["m2"])
+
+    def result(self) -> Decimal:
+        if not self._count:
             raise AggregationError("Нет данных для вычисления avg.")
-        return Decimal(str(mean(self._values)))
+        return self._mean
+
+    def margin(self) -> Optional[Decimal]:
+        """Полуширина 95% доверительного интервала для среднего.
+
+        Возвращает ``None``, если в выборке меньше двух строк.
+        """
+        if self._count < 2:
+            return None
+        variance = self._m2 / (self._count - 1)
+        # поправка на конечность совокупности: при fraction=1 интервал нулевой
+        return _Z_95 * (variance / self._count * (1 - self._fraction)).sqrt()
 
 
 # TODO если нужно добавить новый агрегатор - его необходимо вписать в кортеж
 #  (предварительно создав дочерний класс от агрегатора с реализацией необходимого функционала)
-_AGGREGATORS = {cls.name: cls for cls in (_Min, _Max, _Avg)}
+_AGGREGATORS = {
+    cls.name: cls for cls in (_Min, _Max, _Avg, _ApproxDistinct, _ApproxQuantile)
+}
+
+
+def _make_aggregator(func_name: str) -> _Aggregator:
+    """Создаёт агрегатор по имени функции, включая параметрические approx_pN."""
+    m = _QUANTILE_RE.fullmatch(func_name)
+    if m:
+        aggregator = _ApproxQuantile(int(m.group("pct")) / 100)
+        aggregator.name = func_name
+        return aggregator
+    try:
+        return _AGGREGATORS[func_name]()
+    except KeyError:
+        raise AggregationError(f"Неизвестная функция агрегации '{func_name}'.") from None
 
 
 def _to_decimal(value: str) -> Decimal:
@@ -91,7 +383,117 @@ def _to_decimal(value: str) -> Decimal:
         ) from None
 
 
-def apply_aggregate(rows: Iterable[dict[str, str]], expr: str) -> dict[str, str]:
+def _format_decimal(value: Decimal, places: int) -> str:
+    """Округляет value до places знаков после запятой без лишних нулей."""
+    return format(value.quantize(Decimal(1).scaleb(-places)).normalize(), "f")
+
+
+def parse_aggregate(expr: str) -> tuple[str, str]:
+    """Разбирает выражение ``--aggregate`` на (колонка, функция)."""
+    m = _AGG_RE.fullmatch(expr.strip())
+    if not m:
+        raise AggregationError("Некорректное выражение --aggregate. Ожидается 'column=function'.")
+    return m.group("column").strip(), m.group("func").lower()
+
+
+class AggregateState:
+    """Состояние одной агрегации, пополняемое порциями строк.
+
+    Позволяет вычислять агрегат инкрементально (например, по дописанным в
+    файл строкам) и объединять частичные состояния через .merge().
+    Параметры совпадают с :func:`apply_aggregate`.
+    """
+
+    def __init__(
+        self,
+        expr: str,
+        sample: Optional[float] = None,
+        seed: Union[int, str, None] = None,
+    ) -> None:
+        self.column, self.func_name = parse_aggregate(expr)
+        self._aggregator: _Aggregator = _make_aggregator(self.func_name)
+
+        self._fraction = 1.0 if sample is None else sample
+        self._rng: Optional[random.Random] = None
+        if sample is not None:
+            if self.func_name != "avg":
+                raise AggregationError("Режим --sample поддерживается только для avg.")
+            if not 0 < sample <= 1:
+                raise AggregationError("Доля --sample должна быть в диапазоне (0, 1].")
+            self._aggregator = _SampledAvg(sample)
+            self._rng = random.Random(seed)
+
+        self._processed_any = False
+
+    @property
+    def empty(self) -> bool:
+        """True, если в состояние ещё не поступило ни одной строки."""
+        return not self._processed_any
+
+    def update(self, rows: Iterable[dict[str, str]]) -> None:
+        """Добавляет строки rows к состоянию агрегации."""
+        column = self.column
+        aggregator = self._aggregator
+        rng = self._rng
+        fraction = self._fraction
+        for row in rows:
+            self._processed_any = True
+            if rng is not None and rng.random() >= fraction:
+                continue
+            try:
+                raw = row[column]
+            except KeyError:
+                raise AggregationError(f"Колонка '{column}' не найдена в CSV.") from None
+            aggregator.combine(_to_decimal(raw) if aggregator.numeric else raw)
+
+    def merge(self, other: "AggregateState") -> None:
+        """Объединяет с частичным состоянием той же агрегации."""
+        if (other.column, other.func_name) != (self.column, self.func_name):
+            raise AggregationError("Нельзя объединить состояния разных агрегаций.")
+        self._aggregator.merge(other._aggregator)
+        self._processed_any = self._processed_any or other._processed_any
+
+    def dump(self) -> Dict[str, Any]:
+        """Состояние в виде JSON‑совместимого словаря (см. :meth:`load`)."""
+        return {
+            "processed_any": self._processed_any,
+            "aggregator": self._aggregator.dump(),
+        }
+
+    def load(self, data: Dict[str, Any]) -> None:
+        """Восстанавливает состояние, сохранённое :meth:`dump`, для того же выражения."""
+        self._aggregator.load(data["aggregator"])
+        self._processed_any = bool(data["processed_any"])
+
+    def result(self) -> dict[str, str]:
+        """Возвращает словарь с ключами column, function, value (и ci95)."""
+        if not self._processed_any:
+            raise AggregationError("Нет строк для агрегации.")
+
+        aggregator = self._aggregator
+        result = {
+            "column": self.column,
+            "function": self.func_name,
+            "value": str(aggregator.result()),
+        }
+        if isinstance(aggregator, _SampledAvg):
+            # Оценка по выборке точна лишь до ширины интервала: округляем
+            # интервал до двух значащих цифр, а значение — до того же разряда
+            margin = aggregator.margin()
+            places = _SAMPLE_PLACES
+            if margin:
+                places = max(0, 1 - margin.adjusted())
+            result["value"] = _format_decimal(aggregator.result(), places)
+            result["ci95"] = "n/a" if margin is None else f"±{_format_decimal(margin, places)}"
+        return result
+
+
+def apply_aggregate(
+    rows: Iterable[dict[str, str]],
+    expr: str,
+    sample: Optional[float] = None,
+    seed: Union[int, str, None] = None,
+) -> dict[str, str]:
     """Производит агрегацию над rows в соответствии с expr.
 
     Параметры
@@ -99,38 +501,18 @@ def apply_aggregate(rows: Iterable[dict[str, str]], expr: str) -> dict[str, str]
     rows: iterable
         Входные строки (могут быть уже отфильтрованы).
     expr: str
-        Выражение "column=function" где функция является avg | min | max.
+        Выражение "column=function" где функция является avg | min | max |
+        approx_distinct | approx_median | approx_pN.
+    sample: float, optional
+        Доля строк (0, 1] для случайной выборки. Поддерживается только для avg.
+    seed: int | str, optional
+        Зерно генератора выборки для воспроизводимости.
 
     Возвращает
     -------
     dict[str, str]
-        Словарь с ключами: column, function, value.
+        Словарь с ключами: column, function, value (и ci95 в режиме sample).
     """
-    m = _AGG_RE.fullmatch(expr.strip())
-    if not m:
-        raise AggregationError("Некорректное выражение --aggregate. Ожидается 'column=function'.")
-
-    column = m.group("column").strip()
-    func_name = m.group("func").lower()
-
-    try:
-        agg_cls = _AGGREGATORS[func_name]
-    except KeyError:
-        raise AggregationError(f"Неизвестная функция агрегации '{func_name}'.") from None
-
-    aggregator: _Aggregator = agg_cls()
-
-    processed_any = False
-    for row in rows:
-        try:
-            value = _to_decimal(row[column])
-        except KeyError:
-            raise AggregationError(f"Колонка '{column}' не найдена в CSV.") from None
-        aggregator.combine(value)
-        processed_any = True
-
-    if not processed_any:
-        raise AggregationError("Нет строк для агрегации.")
-
-    result_value = aggregator.result()
-    return {"column": column, "function": func_name, "value": str(result_value)}
+    state = AggregateState(expr, sample=sample, seed=seed)
+    state.update(rows)
+    return state.result()
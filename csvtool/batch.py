@@ -0,0 +1,258 @@
+"""Пакетный режим csvtool: много запросов за один проход по файлу.
+
+Запросы задаются файлом ``--queries``. Текстовый формат — один запрос на
+строку с теми же флагами, что и в командной строке::
+
+    # комментарий
+    --name apple_avg --where "brand=apple" --aggregate "price=avg"
+    --where "price>300" --where "price<800" --aggregate "rating=max"
+
+Файл с расширением ``.json`` содержит список объектов с ключами
+``aggregate`` (обязательно), ``where``, ``sample`` и ``name``.
+
+Каждая пачка строк прогоняется через скомпилированные предикаты и
+агрегаторы всех запросов. Условия запроса проверяются по порядку с
+коротким замыканием, а результат одинакового условия ``--where`` для
+строки вычисляется один раз и переиспользуется другими запросами.
+"""
+from __future__ import annotations
+
+import json
+import shlex
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from csvtool.aggregators import AggregateState, parse_aggregate
+from csvtool.filters import _to_decimal_maybe, compile_where, parse_where
+
+__all__ = ["BatchQuery", "load_queries", "query_columns", "run_queries"]
+
+Row = Dict[str, str]
+
+
+class QueryError(ValueError):
+    """Ошибки в файле запросов."""
+
+
+class BatchQuery:
+    """Один запрос пакетного режима: условия --where и агрегация."""
+
+    def __init__(
+        self,
+        aggregate: str,
+        where: Optional[Sequence[str]] = None,
+        sample: Optional[float] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        self.aggregate = aggregate
+        self.where = list(where or [])
+        self.sample = sample
+        self.name = name or " ".join([*self.where, aggregate])
+
+    def __repr__(self) -> str:
+        return f"BatchQuery(name={self.name!r})"
+
+
+def _parse_line(line: str, lineno: int) -> BatchQuery:
+    """Разбирает строку текстового файла запросов."""
+    try:
+        tokens = shlex.split(line)
+    except ValueError as exc:
+        raise QueryError(f"Строка {lineno}: {exc}") from None
+
+    options: Dict[str, List[str]] = {"--where": [], "--aggregate": [], "--sample": [], "--name": []}
+    it = iter(tokens)
+    for token in it:
+        if token not in options:
+            raise QueryError(f"Строка {lineno}: неизвестный аргумент '{token}'.")
+        value = next(it, None)
+        if value is None:
+            raise QueryError(f"Строка {lineno}: не указано значение для {token}.")
+        options[token].append(value)
+
+    if len(options["--aggregate"]) != 1:
+        raise QueryError(f"Строка {lineno}: требуется ровно один --aggregate.")
+    try:
+        sample = float(options["--sample"][-1]) if options["--sample"] else None
+    except ValueError:
+        raise QueryError(f"Строка {lineno}: --sample должен быть числом.") from None
+
+    return BatchQuery(
+        options["--aggregate"][0],
+        where=options["--where"],
+        sample=sample,
+        name=options["--name"][-1] if options["--name"] else None,
+    )
+
+
+def _parse_item(item: Any, number: int) -> BatchQuery:
+    """Проверяет типы полей запроса из JSON‑файла."""
+    if not isinstance(item, dict):
+        raise QueryError(f"Запрос {number}: ожидается объект.")
+    aggregate = item.get("aggregate")
+    where = item.get("where")
+    sample = item.get("sample")
+    name = item.get("name")
+
+    if not isinstance(aggregate, str):
+        raise QueryError(f"Запрос {number}: 'aggregate' должен быть строкой.")
+    if where is not None and not (
+        isinstance(where, list) and all(isinstance(expr, str) for expr in where)
+    ):
+        raise QueryError(f"Запрос {number}: 'where' должен быть списком строк.")
+    if sample is not None and (isinstance(sample, bool) or not isinstance(sample, (int, float))):
+        raise QueryError(f"Запрос {number}: 'sample' должен быть числом.")
+    if name is not None and not isinstance(name, str):
+        raise QueryError(f"Запрос {number}: 'name' должен быть строкой.")
+
+    return BatchQuery(aggregate, where=where, sample=sample, name=name)
+
+
+def load_queries(path: Path) -> List[BatchQuery]:
+    """Читает файл запросов (текстовый или ``.json``).
+
+    Исключения
+    ----------
+    FileNotFoundError
+        Файл не найден.
+    QueryError
+        Файл запросов некорректен или пуст.
+    """
+    query_path = Path(path)
+    text = query_path.read_text(encoding="utf-8")
+
+    queries: List[BatchQuery] = []
+    if query_path.suffix.lower() == ".json":
+        try:
+            spec = json.loads(text)
+        except ValueError as exc:
+            raise QueryError(f"Некорректный JSON‑файл запросов: {exc}") from None
+        if not isinstance(spec, list):
+            raise QueryError("JSON‑файл запросов должен содержать список объектов.")
+        queries.extend(_parse_item(item, number) for number, item in enumerate(spec, start=1))
+    else:
+        for lineno, line in enumerate(text.splitlines(), start=1):
+            line = line.strip()
+            if line and not line.startswith("#"):
+                queries.append(_parse_line(line, lineno))
+
+    if not queries:
+        raise QueryError("Файл запросов не содержит ни одного запроса.")
+    return queries
+
+
+def query_columns(queries: Sequence[BatchQuery]) -> Optional[List[str]]:
+    """Колонки, нужные всем запросам, или None, если выражение некорректно."""
+    columns: List[str] = []
+    try:
+        for query in queries:
+            columns.extend(parse_where(expr)[0] for expr in query.where)
+            columns.append(parse_aggregate(query.aggregate)[0])
+    except ValueError:
+        return None
+    return list(dict.fromkeys(columns))
+
+
+# Ключ общего предиката: разобранное выражение и тип колонки (число/строка).
+# Предикаты с одинаковым ключом ведут себя одинаково, поэтому их результат
+# для строки можно переиспользовать между запросами.
+_PredicateKey = Tuple[Tuple[str, str, str], bool]
+
+
+class _CompiledQuery:
+    """Запрос с лениво компилируемыми предикатами и состоянием агрегации."""
+
+    def __init__(self, query: BatchQuery) -> None:
+        self.query = query
+        self.error: Optional[str] = None
+        self.state: Optional[AggregateState] = None
+        self._parsed: List[Tuple[str, str, str]] = []
+        self._predicates: List[Optional[Tuple[_PredicateKey, Callable[[Row], bool]]]] = []
+        try:
+            self._parsed = [parse_where(expr) for expr in query.where]
+            self._predicates = [None] * len(self._parsed)
+            self.state = AggregateState(query.aggregate, sample=query.sample)
+        except ValueError as exc:
+            self.error = str(exc)
+
+    def _predicate(self, stage: int, row: Row) -> Tuple[_PredicateKey, Callable[[Row], bool]]:
+        """Предикат условия stage; при первом обращении компилируется по row.
+
+        row — первая строка, прошедшая предыдущие условия запроса, как в
+        последовательных вызовах :func:`~csvtool.filters.apply_where`.
+        """
+        compiled = self._predicates[stage]
+        if compiled is None:
+            parsed = self._parsed[stage]
+            predicate = compile_where(self.query.where[stage], row)
+            key = (parsed, _to_decimal_maybe(row[parsed[0]]) is not None)
+            compiled = self._predicates[stage] = (key, predicate)
+        return compiled
+
+    def select(
+        self, batch: List[Row], cache: Dict[_PredicateKey, List[Optional[bool]]]
+    ) -> List[Row]:
+        """Строки пачки, прошедшие все условия запроса.
+
+        Условия проверяются по порядку с коротким замыканием; результат
+        каждого предиката для строки берётся из cache, если его уже
+        вычислил другой запрос.
+        """
+        if not self._parsed:
+            return batch
+        selected: List[Row] = []
+        for idx, row in enumerate(batch):
+            for stage in range(len(self._parsed)):
+                key, predicate = self._predicate(stage, row)
+                results = cache.get(key)
+                if results is None:
+                    results = cache[key] = [None] * len(batch)
+                passed = results[idx]
+                if passed is None:
+                    passed = results[idx] = predicate(row)
+                if not passed:
+                    break
+            else:
+                selected.append(row)
+        return selected
+
+    def result(self) -> Row:
+        result = {"query": self.query.name}
+        if self.error is None and self.state is not None:
+            try:
+                return {**result, **self.state.result()}
+            except ValueError as exc:
+                self.error = str(exc)
+        return {**result, "error": self.error or ""}
+
+
+def run_queries(batches: Iterable[List[Row]], queries: Sequence[BatchQuery]) -> List[Row]:
+    """Выполняет все queries за один проход по batches.
+
+    Ошибка в одном запросе (например, отсутствующая колонка) не прерывает
+    остальные: в его результате заполняется ключ ``error``. Каждый запрос
+    даёт тот же результат, что и отдельный запуск с его ``--where`` и
+    ``--aggregate``.
+
+    Возвращает
+    ---------
+    List[Dict[str, str]]
+        Результаты в порядке запросов: ``query`` и ключи
+        :func:`~csvtool.aggregators.apply_aggregate` либо ``error``.
+    """
+    compiled = [_CompiledQuery(query) for query in queries]
+
+    for batch in batches:
+        if not batch:
+            continue
+        # Результаты общих предикатов для строк текущей пачки
+        cache: Dict[_PredicateKey, List[Optional[bool]]] = {}
+        for cq in compiled:
+            if cq.error is not None:
+                continue
+            try:
+                cq.state.update(cq.select(batch, cache))  # type: ignore[union-attr]
+            except ValueError as exc:
+                cq.error = str(exc)
+
+    return [cq.result() for cq in compiled]
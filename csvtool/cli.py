@@ -11,9 +11,13 @@ from pathlib import Path
 from typing import Optional
 
 from csvtool.loader import load_csv
-from csvtool.filters import apply_where
-from csvtool.aggregators import apply_aggregate
-from csvtool.renderer import render_rows, render_aggregate
+from csvtool.filters import apply_where, parse_where
+from csvtool.batch import load_queries, query_columns, run_queries
+from csvtool.aggregators import AggregateState, apply_aggregate, parse_aggregate
+from csvtool.follow import IncrementalAggregate, watch
+from csvtool.join import apply_join
+from csvtool.pipeline import filter_batches, iter_batches
+from csvtool.renderer import render_rows, render_aggregate, render_queries
 
 
 def _build_parser() -> argparse.ArgumentParser:
@@ -39,11 +43,98 @@ def _build_parser() -> argparse.ArgumentParser:
         "--aggregate",
         metavar="EXPR",
         help=(
-            "Агрегация вида 'column=function', где function = avg | min | max."
+            "Агрегация вида 'column=function', где function = avg | min | max | "
+            "approx_distinct | approx_median | approx_pN (например, approx_p95). "
             "Если флаг не указан — выводятся отфильтрованные строки."
         ),
     )
 
+    parser.add_argument(
+        "--sample",
+        metavar="FRACTION",
+        type=float,
+        help=(
+            "Доля строк (0, 1] для приближённого avg по случайной выборке. "
+            "Выводится также 95%% доверительный интервал."
+        ),
+    )
+
+    parser.add_argument(
+        "--state",
+        metavar="PATH",
+        type=Path,
+        help=(
+            "Файл состояния для инкрементальной агрегации append-only CSV: "
+            "сохраняет смещение и состояние агрегатора, следующий запуск "
+            "читает только дописанные строки. Требует --aggregate."
+        ),
+    )
+
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help=(
+            "Следить за файлом и выводить агрегат при появлении новых строк. "
+            "При усечении или замене файла выполняется полный пересчёт."
+        ),
+    )
+
+    parser.add_argument(
+        "--interval",
+        metavar="SECONDS",
+        type=float,
+        default=5.0,
+        help="Период опроса файла в режиме --follow (по умолчанию 5 секунд).",
+    )
+
+    parser.add_argument(
+        "--join",
+        metavar="PATH",
+        type=Path,
+        help=(
+            "CSV‑файл для объединения (inner join) с основным по колонке --on. "
+            "Выполняется до фильтрации, поэтому в --where можно использовать его колонки."
+        ),
+    )
+
+    parser.add_argument(
+        "--on",
+        metavar="COLUMN",
+        help="Колонка‑ключ для --join, присутствующая в обоих файлах.",
+    )
+
+    parser.add_argument(
+        "--join-memory",
+        metavar="MB",
+        type=int,
+        default=64,
+        help=(
+            "Бюджет памяти на хэш‑таблицу --join в мегабайтах (по умолчанию 64). "
+            "При превышении данные сбрасываются во временные файлы."
+        ),
+    )
+
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help=(
+            "Конвейерная обработка: чтение, разбор и фильтрация/агрегация идут "
+            "параллельно через ограниченные очереди. Полезно на медленных "
+            "(сетевых) дисках; не совместимо с --join, --state и --follow."
+        ),
+    )
+
+    parser.add_argument(
+        "--queries",
+        metavar="PATH",
+        type=Path,
+        help=(
+            "Файл запросов для пакетного режима: все запросы выполняются за один "
+            "проход по CSV. Текстовый формат — по запросу на строку "
+            "(--where ... --aggregate ... [--name ...]), либо JSON‑список (.json)."
+        ),
+    )
+
     # TODO здесь можно добавить новую команду по аналогии с двумя предыдущими
 
     return parser
@@ -59,9 +150,34 @@ def main(argv: Optional[list[str]] = None) -> None:
     """Точка входа"""
     args = parse_args(argv)
 
+    if (args.join is None) != (args.on is None):
+        print("[csvtool] Флаги --join и --on используются только вместе.", file=sys.stderr)
+        sys.exit(2)
+
+    if args.sample is not None and not args.aggregate:
+        # В том числе --queries: там доля задаётся для каждого запроса отдельно
+        print("[csvtool] Флаг --sample используется только вместе с --aggregate.", file=sys.stderr)
+        sys.exit(2)
+
+    if args.interval <= 0:
+        print("[csvtool] Значение --interval должно быть положительным.", file=sys.stderr)
+        sys.exit(2)
+
+    if args.queries is not None:
+        _run_queries(args)
+        return
+
+    if args.state is not None or args.follow:
+        _run_incremental(args)
+        return
+
+    if args.pipeline:
+        _run_pipeline(args)
+        return
+
     # Загрузка данных
     try:
-        rows = load_csv(args.csv_file)
+        rows = load_csv(args.csv_file, columns=_needed_columns(args))
     except FileNotFoundError:
         print(f"[csvtool] Файл не найден: {args.csv_file}", file=sys.stderr)
         sys.exit(1)
@@ -69,6 +185,20 @@ def main(argv: Optional[list[str]] = None) -> None:
         print(f"[csvtool] Ошибка чтения CSV: {exc}", file=sys.stderr)
         sys.exit(1)
 
+    # Объединение с другим файлом
+    if args.join is not None:
+        try:
+            rows = apply_join(rows, args.join, args.on, memory_limit=args.join_memory * 1024 * 1024)
+        except FileNotFoundError:
+            print(f"[csvtool] Файл не найден: {args.join}", file=sys.stderr)
+            sys.exit(1)
+        except ValueError as exc:
+            print(f"[csvtool] Ошибка объединения: {exc}", file=sys.stderr)
+            sys.exit(2)
+        except Exception as exc:
+            print(f"[csvtool] Ошибка чтения CSV: {exc}", file=sys.stderr)
+            sys.exit(1)
+
     # Фильтрация
     if args.where:
         for expr in args.where:
@@ -83,7 +213,7 @@ def main(argv: Optional[list[str]] = None) -> None:
     # Агрегация или вывод строк
     if args.aggregate:
         try:
-            result = apply_aggregate(rows, args.aggregate)
+            result = apply_aggregate(rows, args.aggregate, sample=args.sample)
             render_aggregate(result)
         except ValueError as exc:
             print(f"[csvtool] Ошибка агрегации: {exc}", file=sys.stderr)
@@ -91,5 +221,132 @@ def main(argv: Optional[list[str]] = None) -> None:
     else:
         render_rows(rows)
 
+
+def _needed_columns(args: argparse.Namespace) -> Optional[list[str]]:
+    """Колонки, которые нужно прочитать из CSV, или None — если все.
+
+    Для агрегации без --join достаточно колонок из --where и --aggregate.
+    """
+    if not args.aggregate or args.join is not None:
+        return None
+    try:
+        columns = [parse_where(expr)[0] for expr in args.where or []]
+        columns.append(parse_aggregate(args.aggregate)[0])
+    except ValueError:
+        # Ошибку в выражении сообщат apply_where / apply_aggregate
+        return None
+    return columns
+
+
+def _run_queries(args: argparse.Namespace) -> None:
+    """Пакетный режим (--queries)."""
+    conflicts = args.where or args.aggregate or args.join or args.state or args.follow
+    if conflicts:
+        print(
+            "[csvtool] --queries нельзя сочетать с --where, --aggregate, --join, "
+            "--state и --follow.",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+
+    try:
+        queries = load_queries(args.queries)
+    except FileNotFoundError:
+        print(f"[csvtool] Файл не найден: {args.queries}", file=sys.stderr)
+        sys.exit(1)
+    except ValueError as exc:
+        print(f"[csvtool] Ошибка в файле запросов: {exc}", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        batches = iter_batches(args.csv_file, columns=query_columns(queries))
+        results = run_queries(batches, queries)
+    except FileNotFoundError:
+        print(f"[csvtool] Файл не найден: {args.csv_file}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as exc:
+        print(f"[csvtool] Ошибка чтения CSV: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    render_queries(results)
+
+
+def _run_pipeline(args: argparse.Namespace) -> None:
+    """Конвейерный режим (--pipeline)."""
+    if args.join is not None:
+        print("[csvtool] Режим --pipeline не поддерживает --join.", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        state = AggregateState(args.aggregate, sample=args.sample) if args.aggregate else None
+        collected = []
+        batches = iter_batches(args.csv_file, columns=_needed_columns(args))
+        for batch in filter_batches(batches, args.where):
+            if state is not None:
+                state.update(batch)
+            else:
+                collected.extend(batch)
+    except FileNotFoundError:
+        print(f"[csvtool] Файл не найден: {args.csv_file}", file=sys.stderr)
+        sys.exit(1)
+    except ValueError as exc:
+        print(f"[csvtool] Ошибка обработки: {exc}", file=sys.stderr)
+        sys.exit(2)
+    except Exception as exc:
+        print(f"[csvtool] Ошибка чтения CSV: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    if state is None:
+        render_rows(collected)
+        return
+    try:
+        render_aggregate(state.result())
+    except ValueError as exc:
+        print(f"[csvtool] Ошибка агрегации: {exc}", file=sys.stderr)
+        sys.exit(2)
+
+
+def _run_incremental(args: argparse.Namespace) -> None:
+    """Инкрементальный режим (--state / --follow)."""
+    if not args.aggregate:
+        print("[csvtool] Режимы --state и --follow требуют --aggregate.", file=sys.stderr)
+        sys.exit(2)
+    if args.join is not None or args.pipeline:
+        print(
+            "[csvtool] Режимы --state и --follow не поддерживают --join и --pipeline.",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+
+    try:
+        if args.state is not None:
+            tracker = IncrementalAggregate.load(
+                args.state, args.csv_file, args.where, args.aggregate, sample=args.sample
+            )
+        else:
+            tracker = IncrementalAggregate(
+                args.csv_file, args.where, args.aggregate, sample=args.sample
+            )
+
+        if args.follow:
+            watch(tracker, render_aggregate, interval=args.interval, state_path=args.state)
+            return
+
+        tracker.poll()
+        tracker.save(args.state)
+        render_aggregate(tracker.result())
+    except FileNotFoundError:
+        print(f"[csvtool] Файл не найден: {args.csv_file}", file=sys.stderr)
+        sys.exit(1)
+    except ValueError as exc:
+        print(f"[csvtool] Ошибка агрегации: {exc}", file=sys.stderr)
+        sys.exit(2)
+    except KeyboardInterrupt:
+        pass
+    except Exception as exc:
+        print(f"[csvtool] Ошибка чтения CSV: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
@@ -9,15 +9,16 @@ from __future__ import annotations
 
 import re
 from decimal import Decimal, InvalidOperation
-from typing import Iterable, List, Dict, Callable, Optional
+from typing import Iterable, List, Dict, Callable, Optional, Sequence, Tuple
 
-__all__ = ["apply_where"]
+__all__ = ["apply_where", "parse_where", "compile_where", "WhereFilter"]
 
 # Регулярное выражение для парсинга строк вида "price>300" или "name=John"
 # TODO Если нужно добавить доп.операторы - их нужно прописать в регулярке
 _EXPR_RE = re.compile(r"(?P<column>[\w\s]+)(?P<op>[><=])(?P<value>.+)")
 
 Comparator = Callable[[str, str], bool]
+Predicate = Callable[[Dict[str, str]], bool]
 
 
 def _to_decimal_maybe(value: str) -> Optional[Decimal]:
@@ -73,6 +74,77 @@ def _make_comparator(op: str, sample_value: str) -> Comparator:
     return compare_str
 
 
+def parse_where(expr: str) -> Tuple[str, str, str]:
+    """Разбирает выражение ``--where`` на (колонка, оператор, значение)."""
+    match = _EXPR_RE.fullmatch(expr.strip())
+    if not match:
+        raise ValueError("Некорректное выражение --where. Ожидается 'column[><=]value'.")
+    return match.group("column").strip(), match.group("op"), match.group("value").strip()
+
+
+def compile_where(expr: str, sample_row: Dict[str, str]) -> Predicate:
+    """Компилирует выражение expr в предикат над строкой.
+
+    Тип колонки (число/строка) определяется по sample_row — обычно по первой
+    строке данных, как в :func:`apply_where`.
+    """
+    column, op, rhs_raw = parse_where(expr)
+    if column not in sample_row:
+        raise ValueError(f"Колонка '{column}' не найдена в CSV.")
+
+    comparator = _make_comparator(op, sample_row[column])
+
+    def predicate(row: Dict[str, str]) -> bool:
+        return comparator(row[column], rhs_raw)
+
+    return predicate
+
+
+class WhereFilter:
+    """Цепочка условий ``--where`` для потоковой обработки пачками.
+
+    Результат совпадает с последовательными вызовами :func:`apply_where` над
+    всеми данными сразу: тип колонки для каждого условия определяется один
+    раз — по первой строке, прошедшей предыдущие условия, — и дальше не
+    меняется между пачками.
+
+    Параметры
+    ---------
+    where
+        Выражения ``--where`` (объединяются AND‑логикой).
+    samples
+        Сохранённые значения, по которым уже определены типы колонок
+        (см. атрибут ``samples``); позволяют продолжить фильтрацию между
+        запусками.
+    """
+
+    def __init__(
+        self, where: Optional[Sequence[str]], samples: Optional[Sequence[Optional[str]]] = None
+    ) -> None:
+        self.where = list(where or [])
+        self._parsed = [parse_where(expr) for expr in self.where]
+        self.samples: List[Optional[str]] = list(samples or [None] * len(self.where))
+        if len(self.samples) != len(self.where):
+            raise ValueError("Число сохранённых образцов не совпадает с числом условий --where.")
+        self._predicates: List[Optional[Predicate]] = [None] * len(self.where)
+
+    def apply(self, rows: Iterable[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Фильтрует очередную пачку строк."""
+        filtered = list(rows)
+        for i, expr in enumerate(self.where):
+            if not filtered:
+                break
+            predicate = self._predicates[i]
+            if predicate is None:
+                column = self._parsed[i][0]
+                sample = self.samples[i]
+                sample_row = filtered[0] if sample is None else {column: sample}
+                predicate = self._predicates[i] = compile_where(expr, sample_row)
+                self.samples[i] = sample_row[column]
+            filtered = [row for row in filtered if predicate(row)]
+        return filtered
+
+
 def apply_where(rows: Iterable[Dict[str, str]], expr: str) -> List[Dict[str, str]]:
     """Фильтрует rows по условию expr.
 
@@ -88,13 +160,8 @@ def apply_where(rows: Iterable[Dict[str, str]], expr: str) -> List[Dict[str, str
     List[Dict[str, str]]
         Список строк, удовлетворяющих условию.
     """
-    match = _EXPR_RE.fullmatch(expr.strip())
-    if not match:
-        raise ValueError("Некорректное выражение --where. Ожидается 'column[><=]value'.")
-
-    column = match.group("column").strip()
-    op = match.group("op")
-    rhs_raw = match.group("value").strip()
+    # Синтаксис проверяем до чтения данных, чтобы ошибка не зависела от их наличия
+    parse_where(expr)
 
     # Берём первую строку, чтобы проверить наличие колонки и определить тип
     try:
@@ -102,11 +169,8 @@ def apply_where(rows: Iterable[Dict[str, str]], expr: str) -> List[Dict[str, str
     except StopIteration:
         return []
 
-    if column not in first_row:
-        raise ValueError(f"Колонка '{column}' не найдена в CSV.")
-
-    comparator = _make_comparator(op, first_row[column])
+    predicate = compile_where(expr, first_row)
 
     # Применяем фильтр
-    filtered: List[Dict[str, str]] = [row for row in rows if comparator(row[column], rhs_raw)]
+    filtered: List[Dict[str, str]] = [row for row in rows if predicate(row)]
     return filtered
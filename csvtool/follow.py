@@ -0,0 +1,320 @@
+"""Инкрементальная агрегация append-only CSV для csvtool.
+
+Модуль запоминает байтовое смещение и состояние агрегатора после каждого
+прохода, поэтому следующий запуск разбирает только дописанные строки.
+Если файл усечён или заменён (ротация), выполняется полный пересчёт.
+
+Незавершённая последняя запись (без перевода строки или с незакрытыми
+кавычками) не читается до тех пор, пока не будет дописана полностью.
+Дописанная часть разбирается потоком блоков, поэтому объём памяти не
+зависит от её размера. Состояние сохраняется в JSON.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from decimal import InvalidOperation
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from csvtool.aggregators import AggregateState, parse_aggregate
+from csvtool.filters import WhereFilter, parse_where
+from csvtool.loader import CSVLoaderError, _parse_blocks, _read_blocks
+
+__all__ = ["IncrementalAggregate", "watch"]
+
+# Сколько первых байт файла используется как отпечаток для обнаружения ротации
+_HEAD_BYTES = 4096
+_STATE_VERSION = 2
+
+
+def _fingerprint(fh, length: int) -> str:
+    """Хэш первых length байт открытого бинарного файла."""
+    fh.seek(0)
+    return hashlib.blake2b(fh.read(length), digest_size=16).hexdigest()
+
+
+def _complete_records(data: bytes) -> int:
+    """Длина префикса data, состоящего из завершённых записей CSV.
+
+    Запись завершена переводом строки вне кавычек; перевод строки внутри
+    незакрытого поля в кавычках запись не завершает.
+    """
+    end = data.rfind(b"\n") + 1
+    if b'"' not in data[:end]:
+        return end
+
+    complete = 0
+    inside = False
+    start = 0
+    while start < end:
+        newline = data.index(b"\n", start, end)
+        if data.count(b'"', start, newline) % 2:
+            inside = not inside
+        if not inside:
+            complete = newline + 1
+        start = newline + 1
+    return complete
+
+
+def _read_header(fh, encoding: str) -> Tuple[Optional[List[str]], int]:
+    """Заголовок CSV и его длина в байтах.
+
+    Возвращает (None, 0), если заголовок ещё не дописан до конца.
+    """
+    fh.seek(0)
+    line = b""
+    while True:
+        part = fh.readline()
+        if not part.endswith(b"\n"):
+            return None, 0
+        line += part
+        if line.count(b'"') % 2 == 0:
+            break
+    try:
+        header = next(csv.reader(io.StringIO(line.decode(encoding), newline="")))
+    except csv.Error as exc:
+        raise CSVLoaderError(f"Ошибка CSV: {exc}") from exc
+    if not header:
+        raise CSVLoaderError("CSV-файл без заголовка не поддерживается.")
+    return header, len(line)
+
+
+class _CompleteBlocks:
+    """Блоки файла, обрезанные по границе завершённых записей.
+
+    Незавершённый остаток в конце файла не выдаётся; consumed — число
+    выданных байт.
+    """
+
+    def __init__(self, fh) -> None:
+        self._fh = fh
+        self.consumed = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        pending = b""
+        for block in _read_blocks(self._fh):
+            # pending начинается на границе записи, поэтому чётность кавычек
+            # в data считается с нуля
+            data = pending + block
+            cut = _complete_records(data)
+            pending = data[cut:]
+            if cut:
+                self.consumed += cut
+                yield data[:cut]
+
+
+class IncrementalAggregate:
+    """Агрегат над файлом, пересчитываемый по дописанным строкам.
+
+    Параметры
+    ---------
+    path
+        Путь к CSV‑файлу.
+    where
+        Выражения ``--where`` (объединяются AND‑логикой).
+    aggregate
+        Выражение ``--aggregate``.
+    sample
+        Доля строк для режима ``--sample`` (только avg).
+    encoding
+        Кодировка файла.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        where: Optional[Sequence[str]],
+        aggregate: str,
+        sample: Optional[float] = None,
+        encoding: str = "utf-8",
+    ) -> None:
+        self.path = Path(path)
+        self.where = list(where or [])
+        self.aggregate = aggregate
+        self.sample = sample
+        self.encoding = encoding
+        self.rescans = 0
+        # Читаются только колонки из --where и --aggregate
+        self._columns = [parse_where(expr)[0] for expr in self.where]
+        self._columns.append(parse_aggregate(aggregate)[0])
+        # Файл уже открывался: его отсутствие — ротация, а не ошибка в пути
+        self._seen = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._state = AggregateState(self.aggregate, sample=self.sample)
+        self._filter = WhereFilter(self.where)
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self._head_len = 0
+        self._head = ""
+        self._fieldnames: Optional[List[str]] = None
+
+    def _key(self) -> list:
+        return [str(self.path.resolve()), self.where, self.aggregate, self.sample]
+
+    def _is_rotated(self, fh, st: os.stat_result) -> bool:
+        if self._offset == 0:
+            return False
+        return (
+            st.st_size < self._offset
+            or st.st_ino != self._inode
+            or _fingerprint(fh, self._head_len) != self._head
+        )
+
+    def poll(self, missing_ok: bool = False) -> int:
+        """Читает дописанные строки и обновляет агрегат.
+
+        Возвращает количество прочитанных (до фильтрации) строк. При
+        усечении или замене файла состояние сбрасывается и файл
+        перечитывается целиком. Смещение сдвигается только после успешного
+        обновления агрегата, поэтому при ошибке строки не теряются.
+
+        Если missing_ok и ранее открывавшегося файла нет (например, в момент
+        ротации через переименование), состояние сбрасывается и возвращается
+        0. Файл, которого не было с самого начала, — ошибка и при missing_ok.
+        """
+        try:
+            fh = self.path.open("rb")
+        except FileNotFoundError:
+            if not missing_ok or not self._seen:
+                raise
+            if self._offset or not self.empty:
+                self._reset()
+                self.rescans += 1
+            return 0
+
+        self._seen = True
+        # Новые строки агрегируются отдельно и вливаются в состояние только
+        # целиком: ошибка посередине не оставит частично учтённых строк
+        chunk = AggregateState(self.aggregate, sample=self.sample)
+        count = 0
+        with fh:
+            st = os.fstat(fh.fileno())
+            if self._is_rotated(fh, st):
+                self._reset()
+                self.rescans += 1
+
+            fieldnames, offset = self._fieldnames, self._offset
+            if fieldnames is None:
+                fieldnames, offset = _read_header(fh, self.encoding)
+                if fieldnames is None:
+                    return 0
+
+            # Файл читается потоком блоков; разбираются только завершённые записи
+            fh.seek(offset)
+            blocks = _CompleteBlocks(fh)
+            for batch in _parse_blocks(blocks, self.encoding, self._columns, fieldnames):
+                count += len(batch)
+                chunk.update(self._filter.apply(batch))
+            offset += blocks.consumed
+
+            head_len, head = self._head_len, self._head
+            if head_len < _HEAD_BYTES:
+                head_len = min(_HEAD_BYTES, offset)
+                head = _fingerprint(fh, head_len)
+
+        self._state.merge(chunk)
+        self._fieldnames = fieldnames
+        self._offset = offset
+        self._inode = st.st_ino
+        self._head_len, self._head = head_len, head
+        return count
+
+    @property
+    def empty(self) -> bool:
+        """True, если ни одна строка ещё не попала в агрегат."""
+        return self._state.empty
+
+    def result(self) -> Dict[str, str]:
+        """Текущий результат агрегации (см. :meth:`AggregateState.result`)."""
+        return self._state.result()
+
+    def save(self, state_path: Path) -> None:
+        """Атомарно сохраняет смещение и состояние агрегатора в state_path (JSON)."""
+        payload = {
+            "version": _STATE_VERSION,
+            "key": self._key(),
+            "offset": self._offset,
+            "inode": self._inode,
+            "head_len": self._head_len,
+            "head": self._head,
+            "fieldnames": self._fieldnames,
+            "where_samples": self._filter.samples,
+            "state": self._state.dump(),
+        }
+        state_path = Path(state_path)
+        tmp_path = state_path.with_name(state_path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as fh:
+            json.dump(payload, fh, ensure_ascii=False)
+        os.replace(tmp_path, state_path)
+
+    @classmethod
+    def load(
+        cls,
+        state_path: Path,
+        path: Path,
+        where: Optional[Sequence[str]],
+        aggregate: str,
+        sample: Optional[float] = None,
+        encoding: str = "utf-8",
+    ) -> "IncrementalAggregate":
+        """Восстанавливает состояние из state_path.
+
+        Если файл состояния отсутствует, повреждён или сохранён для другого
+        файла/запроса, возвращается пустое состояние (полный пересчёт).
+        """
+        tracker = cls(path, where, aggregate, sample=sample, encoding=encoding)
+        try:
+            with Path(state_path).open(encoding="utf-8") as fh:
+                payload = json.load(fh)
+            if payload["version"] != _STATE_VERSION or payload["key"] != tracker._key():
+                return tracker
+            tracker._offset = int(payload["offset"])
+            tracker._inode = payload["inode"]
+            tracker._head_len = int(payload["head_len"])
+            tracker._head = payload["head"]
+            tracker._fieldnames = payload["fieldnames"]
+            tracker._filter = WhereFilter(tracker.where, payload["where_samples"])
+            tracker._state.load(payload["state"])
+            tracker._seen = tracker._inode is not None
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, InvalidOperation):
+            tracker._reset()
+        return tracker
+
+
+def watch(
+    tracker: IncrementalAggregate,
+    on_result: Callable[[Dict[str, str]], None],
+    interval: float = 5.0,
+    state_path: Optional[Path] = None,
+    max_polls: Optional[int] = None,
+) -> None:
+    """Следит за файлом и вызывает on_result после каждого обновления.
+
+    Результат выдаётся при первом проходе и затем только при появлении
+    новых строк; пока в агрегат не попало ни одной строки, вывода нет.
+    Временное отсутствие уже прочитанного файла (ротация через
+    переименование) считается ротацией: состояние сбрасывается, и файл
+    перечитывается, когда появится. Если файла нет при первой проверке,
+    выбрасывается FileNotFoundError.
+    max_polls ограничивает число проверок (для тестов).
+    """
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        rescans = tracker.rescans
+        if tracker.poll(missing_ok=True) or polls == 0 or tracker.rescans != rescans:
+            if state_path is not None:
+                tracker.save(state_path)
+            if not tracker.empty:
+                on_result(tracker.result())
+        polls += 1
+        if max_polls is None or polls < max_polls:
+            time.sleep(interval)
@@ -0,0 +1,216 @@
+"""Объединение (inner hash join) CSV‑файлов для csvtool.
+
+Модуль реализует `--join other.csv --on key`: хэш‑таблица строится по
+меньшему из входов, второй вход проходит через неё потоком. Если
+строящаяся таблица превышает бюджет памяти, выполняется grace hash join:
+оба входа разбиваются по хэшу ключа на временные файлы, и каждая пара
+разделов объединяется отдельно.
+
+Ключи сравниваются как строки, без преобразования типов. Результат идёт
+в порядке строк основного файла: каждая строка помечается номером, который
+переживает сброс во временные файлы.
+"""
+from __future__ import annotations
+
+import csv
+import itertools
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from csvtool.loader import CSVLoaderError
+
+__all__ = ["apply_join"]
+
+# Бюджет памяти на хэш‑таблицу по умолчанию (в байтах)
+_DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+# Примерные накладные расходы Python на одну строку‑словарь
+_ROW_OVERHEAD = 200
+# Число разделов grace hash join и максимальная глубина повторного разбиения
+_PARTITIONS = 16
+_MAX_DEPTH = 3
+# Служебная колонка с номером строки основного файла
+_ORDER = "__csvtool_row__"
+
+Row = Dict[str, str]
+Merger = Callable[[Row, Row], Row]
+
+
+class JoinError(ValueError):
+    """Ошибки объединения CSV‑файлов."""
+
+
+def _text_size(row: Row) -> int:
+    """Примерный размер строки в CSV‑файле (в байтах)."""
+    return sum(len(str(value)) + 1 for value in row.values())
+
+
+def _read_rows(path: Path, encoding: str) -> Iterator[Row]:
+    """Потоково читает CSV‑файл path."""
+    try:
+        with path.open(newline="", encoding=encoding) as fh:
+            yield from csv.DictReader(fh)
+    except csv.Error as exc:
+        raise CSVLoaderError(f"Ошибка CSV: {exc}") from exc
+
+
+def _read_header(path: Path, encoding: str) -> List[str]:
+    with path.open(newline="", encoding=encoding) as fh:
+        fieldnames = csv.DictReader(fh).fieldnames
+    if fieldnames is None:
+        raise CSVLoaderError("CSV-файл без заголовка не поддерживается.")
+    return list(fieldnames)
+
+
+def _partition(rows: Iterable[Row], prefix: Path, on: str, depth: int) -> List[Optional[Path]]:
+    """Раскладывает rows по _PARTITIONS временным файлам по хэшу ключа."""
+    paths: List[Optional[Path]] = [None] * _PARTITIONS
+    handles = {}
+    writers: Dict[int, csv.DictWriter] = {}
+    try:
+        for row in rows:
+            idx = hash((depth, row[on])) % _PARTITIONS
+            writer = writers.get(idx)
+            if writer is None:
+                path = prefix.with_name(f"{prefix.name}-{depth}-{idx}.csv")
+                paths[idx] = path
+                handles[idx] = path.open("w", newline="", encoding="utf-8")
+                writer = writers[idx] = csv.DictWriter(handles[idx], fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+    finally:
+        for fh in handles.values():
+            fh.close()
+    return paths
+
+
+def _grace_join(
+    build: Iterable[Row],
+    probe: Iterable[Row],
+    on: str,
+    merge: Merger,
+    memory_limit: int,
+    depth: int,
+    out: List[Row],
+) -> None:
+    """Объединение через разбиение обоих входов на временные файлы."""
+    with tempfile.TemporaryDirectory(prefix="csvtool-join-") as tmp:
+        build_parts = _partition(build, Path(tmp) / "build", on, depth)
+        probe_parts = _partition(probe, Path(tmp) / "probe", on, depth)
+        for build_path, probe_path in zip(build_parts, probe_parts):
+            if build_path is None or probe_path is None:
+                continue
+            _hash_join(
+                _read_rows(build_path, "utf-8"),
+                _read_rows(probe_path, "utf-8"),
+                on,
+                merge,
+                memory_limit,
+                depth + 1,
+                out,
+            )
+
+
+def _hash_join(
+    build: Iterable[Row],
+    probe: Iterable[Row],
+    on: str,
+    merge: Merger,
+    memory_limit: int,
+    depth: int,
+    out: List[Row],
+) -> None:
+    """Классический hash join с переходом на grace hash join при нехватке памяти."""
+    table: Dict[str, List[Row]] = {}
+    used = 0
+    build_iter = iter(build)
+    for row in build_iter:
+        table.setdefault(row[on], []).append(row)
+        used += _ROW_OVERHEAD + _text_size(row)
+        if used > memory_limit and depth < _MAX_DEPTH:
+            spilled = itertools.chain(
+                (r for matches in table.values() for r in matches), build_iter
+            )
+            _grace_join(spilled, probe, on, merge, memory_limit, depth, out)
+            return
+
+    for row in probe:
+        for match in table.get(row[on], ()):
+            out.append(merge(row, match))
+
+
+def apply_join(
+    rows: List[Row],
+    path: Path,
+    on: str,
+    memory_limit: int = _DEFAULT_MEMORY_LIMIT,
+    encoding: str = "utf-8",
+) -> List[Row]:
+    """Объединяет rows со строками CSV‑файла path по равенству колонки on.
+
+    Параметры
+    ---------
+    rows
+        Строки основного файла.
+    path
+        Путь к присоединяемому CSV‑файлу.
+    on
+        Имя колонки‑ключа, присутствующей в обоих входах.
+    memory_limit
+        Бюджет памяти (в байтах) на хэш‑таблицу; при превышении данные
+        сбрасываются во временные файлы.
+    encoding
+        Кодировка присоединяемого файла.
+
+    Возвращает
+    ---------
+    List[Dict[str, str]]
+        Объединённые строки (inner join). Колонки присоединяемого файла,
+        совпадающие по имени с колонками rows, получают суффикс
+        ``_<имя файла>``. Строки идут в порядке rows, совпадения одной
+        строки — в порядке файла path.
+    """
+    other = Path(path)
+    if not other.is_file():
+        raise FileNotFoundError(path)
+    if not rows:
+        return []
+
+    if on not in rows[0]:
+        raise JoinError(f"Колонка '{on}' не найдена в CSV.")
+    if on not in _read_header(other, encoding):
+        raise JoinError(f"Колонка '{on}' не найдена в {other.name}.")
+
+    left_columns = set(rows[0])
+    suffix = other.stem
+
+    def merge_right(left: Row, right: Row) -> Row:
+        merged = dict(left)
+        for column, value in right.items():
+            if column != on:
+                merged[f"{column}_{suffix}" if column in left_columns else column] = value
+        return merged
+
+    # Хэш‑таблица строится по меньшему входу
+    build_left = sum(_text_size(row) for row in rows) <= other.stat().st_size
+    tagged = ({**row, _ORDER: str(idx)} for idx, row in enumerate(rows))
+
+    out: List[Row] = []
+    if build_left:
+        _hash_join(
+            tagged,
+            _read_rows(other, encoding),
+            on,
+            lambda probe, build: merge_right(build, probe),
+            memory_limit,
+            0,
+            out,
+        )
+    else:
+        _hash_join(_read_rows(other, encoding), tagged, on, merge_right, memory_limit, 0, out)
+
+    # Сортировка устойчива: совпадения одной строки остаются в порядке второго файла
+    out.sort(key=lambda row: int(row[_ORDER]))
+    for row in out:
+        del row[_ORDER]
+    return out
@@ -3,21 +3,214 @@
 Модуль читает весь файл в память и возвращает список словарей. Ключи —
 названия колонок из первой строки (заголовка). Преобразование типов не
 выполняется.
+
+Для «простых» файлов (без кавычек и одиночных ``\r``) используется быстрый
+путь: файл читается крупными бинарными блоками и режется по переводам строк
+и запятым, а при заданном ``columns`` декодируются только нужные колонки.
+Встретив кавычку, разбор без перечитывания файла переходит на модуль
+:mod:`csv`; результат обоих путей одинаков. Разбор работает над потоком
+блоков, что позволяет использовать его в конвейере (см. ``pipeline``).
 """
 from __future__ import annotations
 
+import codecs
 import csv
+import io
+import itertools
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 __all__ = ["load_csv"]
 
 
+# Размер читаемого блока и число строк в пачке при разборе модулем csv
+_BLOCK_SIZE = 1 << 20
+_BATCH_ROWS = 10_000
+# Кодировки, в которых байты «,», «\n», «\r» и «"» не встречаются внутри
+# многобайтовых символов — для них безопасно резать файл на уровне байтов
+_SIMPLE_ENCODINGS = {"utf-8", "utf-8-sig", "ascii", "iso8859-1", "cp1251", "cp1252"}
+
+
 class CSVLoaderError(Exception):
     """Базовая ошибка при чтении CSV."""
 
 
-def load_csv(path: Optional[Path], encoding: str = "utf-8") -> List[Dict[str, str]]:
+def _make_row(fieldnames: List[str], fields: List[str]) -> Dict[str, str]:
+    """Собирает словарь так же, как :class:`csv.DictReader`."""
+    row = dict(zip(fieldnames, fields))
+    n_names, n_fields = len(fieldnames), len(fields)
+    if n_names < n_fields:
+        row[None] = fields[n_names:]  # type: ignore[index, assignment]
+    elif n_names > n_fields:
+        for name in fieldnames[n_fields:]:
+            row[name] = None  # type: ignore[assignment]
+    return row
+
+
+def _pick_row(
+    picks: List[Tuple[str, int]], fields: List[bytes], encoding: str
+) -> Dict[str, str]:
+    """Строка режима columns, в которой не хватает полей (как в :class:`csv.DictReader`)."""
+    n = len(fields)
+    row: Dict[str, str] = {}
+    for name, i in picks:
+        row[name] = fields[i].decode(encoding) if i < n else None  # type: ignore[assignment]
+    return row
+
+
+def _read_blocks(fh: BinaryIO) -> Iterator[bytes]:
+    """Читает бинарный файл блоками по _BLOCK_SIZE байт."""
+    while True:
+        block = fh.read(_BLOCK_SIZE)
+        if not block:
+            return
+        yield block
+
+
+class _BlockStream(io.RawIOBase):
+    """Файлоподобная обёртка над итератором байтовых блоков."""
+
+    def __init__(self, blocks: Iterator[bytes]) -> None:
+        self._blocks = blocks
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            self._buffer = next(self._blocks, b"")
+            if not self._buffer:
+                return 0
+        n = min(len(buffer), len(self._buffer))
+        buffer[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def _parse_general(
+    blocks: Iterator[bytes],
+    encoding: str,
+    columns: Optional[Sequence[str]],
+    fieldnames: Optional[List[str]] = None,
+) -> Iterator[List[Dict[str, str]]]:
+    """Разбор произвольного CSV модулем :mod:`csv`, пачками по _BATCH_ROWS строк.
+
+    Если fieldnames переданы, поток начинается сразу с данных (заголовок уже
+    прочитан быстрым путём).
+    """
+    text = io.TextIOWrapper(io.BufferedReader(_BlockStream(blocks)), encoding=encoding, newline="")
+    try:
+        reader = csv.DictReader(text, fieldnames=fieldnames)
+        if reader.fieldnames is None:
+            raise CSVLoaderError("CSV-файл без заголовка не поддерживается.")
+        wanted = None if columns is None else [c for c in columns if c in reader.fieldnames]
+        while True:
+            batch = list(itertools.islice(reader, _BATCH_ROWS))
+            if not batch:
+                return
+            if wanted is not None:
+                batch = [{name: row[name] for name in wanted} for row in batch]
+            yield batch
+    except csv.Error as exc:
+        raise CSVLoaderError(f"Ошибка CSV: {exc}") from exc
+
+
+def _pick_columns(
+    fieldnames: List[str], columns: Optional[Sequence[str]]
+) -> Optional[List[Tuple[str, int]]]:
+    """Пары «колонка → индекс поля» для режима columns."""
+    if columns is None:
+        return None
+    index = {name: i for i, name in enumerate(fieldnames)}
+    return [(name, index[name]) for name in columns if name in index]
+
+
+def _parse_blocks(
+    blocks: Iterable[bytes],
+    encoding: str,
+    columns: Optional[Sequence[str]] = None,
+    fieldnames: Optional[List[str]] = None,
+) -> Iterator[List[Dict[str, str]]]:
+    """Разбирает поток байтовых блоков CSV и выдаёт строки пачками.
+
+    Пока данные «простые», работает быстрый путь. Встретив кавычку,
+    одиночный ``\r`` или пустую первую строку, передаёт необработанный
+    остаток потока модулю :mod:`csv`. Переключение происходит на границе
+    строк, поэтому уже выданные строки совпадают с результатом :mod:`csv`,
+    а файл не перечитывается.
+
+    Если fieldnames переданы, поток начинается сразу с данных (заголовок
+    прочитан ранее, например при инкрементальном чтении).
+    """
+    blocks = iter(blocks)
+    if codecs.lookup(encoding).name not in _SIMPLE_ENCODINGS:
+        yield from _parse_general(blocks, encoding, columns, fieldnames)
+        return
+
+    picks = None if fieldnames is None else _pick_columns(fieldnames, columns)
+    tail = b""
+
+    for block in itertools.chain(blocks, [b""]):
+        raw = tail + block
+        data = raw
+        if block:
+            # Обрабатываем только завершённые строки, остаток — в следующий блок
+            cut = data.rfind(b"\n") + 1
+            data, tail = data[:cut], data[cut:]
+
+        simple = b'"' not in data
+        if simple and b"\r" in data:
+            data = data.replace(b"\r\n", b"\n")
+            if not block and data.endswith(b"\r"):
+                data = data[:-1]
+            simple = b"\r" not in data
+        if simple and fieldnames is None:
+            simple = not data.startswith(b"\n")
+        if not simple:
+            yield from _parse_general(
+                itertools.chain([raw], blocks), encoding, columns, fieldnames
+            )
+            return
+
+        if fieldnames is None and data:
+            header, _, data = data.partition(b"\n")
+            fieldnames = header.decode(encoding).split(",")
+            picks = _pick_columns(fieldnames, columns)
+
+        rows: List[Dict[str, str]] = []
+        if picks is not None:
+            width = max((i for _, i in picks), default=-1) + 1
+            for raw_line in data.split(b"\n"):
+                if not raw_line:
+                    continue
+                raw_fields = raw_line.split(b",")
+                if len(raw_fields) >= width:
+                    rows.append({name: raw_fields[i].decode(encoding) for name, i in picks})
+                else:
+                    rows.append(_pick_row(picks, raw_fields, encoding))
+        elif fieldnames is not None:
+            n_names = len(fieldnames)
+            for line in data.decode(encoding).split("\n"):
+                if not line:
+                    continue
+                fields = line.split(",")
+                if len(fields) == n_names:
+                    rows.append(dict(zip(fieldnames, fields)))
+                else:
+                    rows.append(_make_row(fieldnames, fields))
+        if rows:
+            yield rows
+
+    if fieldnames is None:
+        raise CSVLoaderError("CSV-файл без заголовка не поддерживается.")
+
+
+def load_csv(
+    path: Optional[Path],
+    encoding: str = "utf-8",
+    columns: Optional[Sequence[str]] = None,
+) -> List[Dict[str, str]]:
     """Считывает *весь* CSV‑файл и возвращает данные.
 
     Параметры
@@ -26,6 +219,9 @@ def load_csv(path: Optional[Path], encoding: str = "utf-8") -> List[Dict[str, st
         Путь к файлу CSV.
     encoding : str, default «utf‑8»
         Кодировка файла.
+    columns : Sequence[str], optional
+        Если задано — в строки попадают только эти колонки (отсутствующие в
+        заголовке пропускаются). По умолчанию читаются все колонки.
 
     Возвращает
     ----------
@@ -44,13 +240,8 @@ def load_csv(path: Optional[Path], encoding: str = "utf-8") -> List[Dict[str, st
     if not csv_path.is_file():
         raise FileNotFoundError(path)
 
-    try:
-        with csv_path.open(newline="", encoding=encoding) as fh:
-            reader = csv.DictReader(fh)
-            if reader.fieldnames is None:
-                raise CSVLoaderError("CSV-файл без заголовка не поддерживается.")
-            rows: List[Dict[str, str]] = list(reader)
-    except csv.Error as exc:
-        raise CSVLoaderError(f"Ошибка CSV: {exc}") from exc
-
+    rows: List[Dict[str, str]] = []
+    with csv_path.open("rb") as fh:
+        for batch in _parse_blocks(_read_blocks(fh), encoding, columns):
+            rows.extend(batch)
     return rows
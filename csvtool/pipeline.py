@@ -0,0 +1,163 @@
+"""Конвейерная обработка CSV для csvtool.
+
+Чтение, разбор и фильтрация/агрегация выполняются одновременно:
+
+    чтение блоков  →  [очередь]  →  разбор в пачки строк  →  [очередь]  →  потребитель
+
+Стадии чтения и разбора работают в отдельных потоках и связаны
+ограниченными очередями: если потребитель не успевает, производители
+блокируются (backpressure). Так задержка ввода‑вывода (например, на
+сетевом хранилище) скрывается за вычислениями, а в памяти одновременно
+находится не более ``queue_size`` блоков и пачек.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from csvtool.filters import WhereFilter
+from csvtool.loader import _parse_blocks, _read_blocks
+
+__all__ = ["iter_batches", "filter_batches"]
+
+# Ёмкость каждой из очередей между стадиями по умолчанию
+_QUEUE_SIZE = 4
+# Период проверки флага остановки при ожидании места в очереди (секунды)
+_POLL_INTERVAL = 0.1
+
+Row = Dict[str, str]
+
+
+class _Done:
+    """Маркер конца потока; несёт исключение стадии, если оно было."""
+
+    def __init__(self, error: Optional[BaseException] = None) -> None:
+        self.error = error
+
+
+def _put(q: "queue.Queue[Any]", item: Any, stop: threading.Event) -> bool:
+    """Кладёт item в очередь, ожидая места; False — если конвейер остановлен."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(q: "queue.Queue[Any]") -> Iterator[Any]:
+    """Выдаёт элементы очереди до маркера конца, пробрасывая ошибки стадии."""
+    while True:
+        item = q.get()
+        if isinstance(item, _Done):
+            if item.error is not None:
+                raise item.error
+            return
+        yield item
+
+
+def _clear(q: "queue.Queue[Any]") -> None:
+    """Опустошает очередь без ожидания."""
+    while True:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            return
+
+
+def _run_stage(
+    items: Iterable[Any], out: "queue.Queue[Any]", stop: threading.Event
+) -> None:
+    """Тело потока‑стадии: перекладывает items в out и завершает маркером."""
+    try:
+        for item in items:
+            if not _put(out, item, stop):
+                return
+    except BaseException as exc:  # ошибка передаётся потребителю
+        _put(out, _Done(exc), stop)
+        return
+    _put(out, _Done(), stop)
+
+
+def iter_batches(
+    path: Path,
+    encoding: str = "utf-8",
+    columns: Optional[Sequence[str]] = None,
+    queue_size: int = _QUEUE_SIZE,
+) -> Iterator[List[Row]]:
+    """Потоково читает CSV‑файл и выдаёт строки пачками.
+
+    Параметры
+    ---------
+    path
+        Путь к CSV‑файлу.
+    encoding
+        Кодировка файла.
+    columns
+        Если задано — читаются только эти колонки (см. :func:`load_csv`).
+    queue_size
+        Ёмкость очередей между стадиями.
+
+    Возвращает
+    ---------
+    Iterator[List[Dict[str, str]]]
+        Пачки строк в порядке следования в файле; при склейке совпадают с
+        результатом :func:`~csvtool.loader.load_csv`.
+    """
+    csv_path = Path(path)
+    if not csv_path.is_file():
+        raise FileNotFoundError(path)
+    if queue_size < 1:
+        raise ValueError("Ёмкость очереди должна быть положительной.")
+
+    fh = csv_path.open("rb")
+    stop = threading.Event()
+    blocks: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    batches: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+
+    reader = threading.Thread(
+        target=_run_stage, args=(_read_blocks(fh), blocks, stop), name="csvtool-read", daemon=True
+    )
+    parser = threading.Thread(
+        target=_run_stage,
+        args=(_parse_blocks(_drain(blocks), encoding, columns), batches, stop),
+        name="csvtool-parse",
+        daemon=True,
+    )
+    reader.start()
+    parser.start()
+    try:
+        yield from _drain(batches)
+    finally:
+        # Потребитель завершился (или прервался): останавливаем стадии
+        stop.set()
+        while parser.is_alive():
+            _clear(blocks)
+            _clear(batches)
+            try:
+                # Разблокируем парсер, если он ждёт новый блок
+                blocks.put_nowait(_Done())
+            except queue.Full:
+                pass
+            parser.join(_POLL_INTERVAL)
+        reader.join()
+        fh.close()
+
+
+def filter_batches(
+    batches: Iterable[List[Row]], where: Optional[Sequence[str]]
+) -> Iterator[List[Row]]:
+    """Применяет выражения ``--where`` к каждой пачке строк.
+
+    Тип колонок определяется один раз по первым строкам данных (см.
+    :class:`~csvtool.filters.WhereFilter`), поэтому результат совпадает с
+    обычным режимом. Пустые после фильтрации пачки пропускаются.
+    """
+    where_filter = WhereFilter(where)
+    for batch in batches:
+        batch = where_filter.apply(batch)
+        if batch:
+            yield batch
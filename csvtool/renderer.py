@@ -5,7 +5,7 @@ from typing import Iterable, Dict, List, Any
 
 from tabulate import tabulate
 
-__all__ = ["render_rows", "render_aggregate"]
+__all__ = ["render_rows", "render_aggregate", "render_queries"]
 
 
 def _safe_print(table: str) -> None:
@@ -34,10 +34,29 @@ def render_rows(rows: Iterable[Dict[str, Any]]) -> None:
 
 
 def render_aggregate(result: Dict[str, str]) -> None:
-    """Отображает результат агрегации."""
+    """Отображает результат агрегации (и ci95, если он есть)."""
+    headers = ["column", "function", "value"]
+    if "ci95" in result:
+        headers.append("ci95")
     table = tabulate(
-        [[result["column"], result["function"], result["value"]]],
-        headers=["column", "function", "value"],
+        [[result[key] for key in headers]],
+        headers=headers,
+        tablefmt="github",
+        stralign="left",
+        numalign="right",
+    )
+    _safe_print(table)
+
+
+def render_queries(results: List[Dict[str, str]]) -> None:
+    """Отображает результаты пакетного режима: одна строка на запрос."""
+    headers = ["query", "column", "function", "value"]
+    for optional in ("ci95", "error"):
+        if any(optional in result for result in results):
+            headers.append(optional)
+    table = tabulate(
+        [[result.get(key, "") for key in headers] for result in results],
+        headers=headers,
         tablefmt="github",
         stralign="left",
         numalign="right",
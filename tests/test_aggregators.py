@@ -1,15 +1,20 @@
 """Полный набор тестов для модуля csvtool.aggregators.
 """
+import json
 from decimal import Decimal
 
 import pytest
 
 from csvtool.aggregators import (
+    AggregateState,
     apply_aggregate,
     AggregationError,
     _Min,
     _Max,
     _Avg,
+    _ApproxDistinct,
+    _ApproxQuantile,
+    _SampledAvg,
 )
 
 # ---------- Позитивные сценарии -------------------------------------------------
@@ -81,3 +86,164 @@ def test_aggregator_no_data(agg_cls, msg_part):
     aggregator = agg_cls()
     with pytest.raises(AggregationError, match=f"Нет данных для вычисления {msg_part}"):
         aggregator.result()
+
+
+# ---------- Приближённые агрегаторы --------------------------------------------
+
+
+def test_approx_distinct_strings():
+    """approx_distinct работает и со строковыми колонками."""
+    rows = [{"brand": b} for b in ("apple", "samsung", "apple", "xiaomi")]
+    result = apply_aggregate(rows, "brand=approx_distinct")
+    assert result["value"] == "3"
+
+
+def test_approx_distinct_accuracy_and_merge():
+    left, right = _ApproxDistinct(), _ApproxDistinct()
+    for i in range(30_000):
+        left.combine(str(i))
+    for i in range(20_000, 50_000):
+        right.combine(str(i))
+    left.merge(right)
+    assert abs(left.result() - 50_000) < 50_000 * Decimal("0.05")
+
+
+def test_approx_median_exact_for_small_input():
+    rows = [{"price": "100"}, {"price": "200"}, {"price": "50"}]
+    result = apply_aggregate(rows, "price=approx_median")
+    assert result["value"] == "100"
+
+
+def test_approx_quantile_bounded_memory_and_merge():
+    parts = [_ApproxQuantile(0.9) for _ in range(4)]
+    for n in range(100_000):
+        parts[n % 4].combine(Decimal(n))
+    sketch = parts[0]
+    for other in parts[1:]:
+        sketch.merge(other)
+    retained = sum(len(c) for c in sketch._compactors)
+    assert retained < 1_000
+    assert abs(sketch.result() - 90_000) < 2_000
+
+
+def test_approx_quantile_is_deterministic():
+    rows = [{"price": str((n * 7919) % 10_007)} for n in range(20_000)]
+    results = {apply_aggregate(rows, "price=approx_p90")["value"] for _ in range(3)}
+    assert len(results) == 1
+
+
+def test_approx_percentile_expression():
+    rows = [{"price": str(n)} for n in range(1, 101)]
+    result = apply_aggregate(rows, "price=approx_p95")
+    assert result["function"] == "approx_p95"
+    assert result["value"] == "95"
+
+
+def test_sample_avg_with_ci():
+    rows = [{"price": str(n)} for n in range(10_000)]
+    result = apply_aggregate(rows, "price=avg", sample=0.2, seed=1)
+    value = Decimal(result["value"])
+    margin = Decimal(result["ci95"].lstrip("±"))
+    assert 0 < margin < 200
+    assert abs(value - Decimal("4999.5")) < 2 * margin
+
+
+def test_sample_result_rounded_to_ci_precision():
+    rows = [{"price": str(n / 1000)} for n in range(10_000)]
+    result = apply_aggregate(rows, "price=avg", sample=0.2, seed=1)
+    # интервал — две значащие цифры, значение — тот же разряд
+    assert result == {"column": "price", "function": "avg", "value": "5.12", "ci95": "±0.11"}
+
+
+def test_sample_single_row_has_value_without_ci():
+    result = apply_aggregate([{"price": "5"}], "price=avg", sample=1.0)
+    assert result["value"] == "5"
+    assert result["ci95"] == "n/a"
+
+
+def test_sampled_avg_merge():
+    left, right, whole = _SampledAvg(), _SampledAvg(), _SampledAvg()
+    for n in range(10):
+        (left if n < 4 else right).combine(Decimal(n))
+        whole.combine(Decimal(n))
+    left.merge(right)
+    assert left.result() == whole.result()
+    assert abs(left._m2 - whole._m2) < Decimal("1e-20")
+
+
+@pytest.mark.parametrize(
+    "expr, sample, exc_pattern",
+    [
+        ("price=max", 0.5, r"только для avg"),
+        ("price=avg", 1.5, r"диапазоне"),
+    ],
+)
+def test_sample_invalid(expr, sample, exc_pattern):
+    with pytest.raises(AggregationError, match=exc_pattern):
+        apply_aggregate([{"price": "1"}], expr, sample=sample)
+
+
+@pytest.mark.parametrize("agg_cls", [_Min, _Max, _Avg])
+def test_exact_aggregators_merge(agg_cls):
+    left, right = agg_cls(), agg_cls()
+    left.combine(Decimal("3"))
+    right.combine(Decimal("1"))
+    right.combine(Decimal("5"))
+    left.merge(right)
+    expected = {"min": Decimal("1"), "max": Decimal("5"), "avg": Decimal("3")}
+    assert left.result() == expected[agg_cls.name]
+
+
+def test_merge_different_aggregators_rejected():
+    with pytest.raises(AggregationError, match=r"разных агрегаторов"):
+        _Min().merge(_Max())
+
+
+# ---------- Сохранение состояния -----------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "expr, sample",
+    [
+        ("price=min", None),
+        ("price=max", None),
+        ("price=avg", None),
+        ("price=approx_distinct", None),
+        ("price=approx_p90", None),
+    ],
+)
+def test_state_json_roundtrip(expr, sample):
+    """dump()/load() через JSON дают то же состояние, что и непрерывный подсчёт."""
+    rows = [{"price": str(n)} for n in range(1_000)]
+    whole = AggregateState(expr, sample=sample, seed=7)
+    whole.update(rows)
+
+    first = AggregateState(expr, sample=sample, seed=7)
+    first.update(rows[:400])
+    restored = AggregateState(expr, sample=sample)
+    restored.load(json.loads(json.dumps(first.dump())))
+    restored.update(rows[400:])
+
+    if expr.endswith("approx_p90"):
+        assert abs(Decimal(restored.result()["value"]) - 900) < 30
+    else:
+        assert restored.result() == whole.result()
+
+
+def test_sampled_state_json_roundtrip():
+    """Сохраняется только состояние агрегатора, без генератора выборки."""
+    state = AggregateState("price=avg", sample=0.5, seed=7)
+    state.update({"price": str(n)} for n in range(1_000))
+    data = json.loads(json.dumps(state.dump()))
+    assert set(data) == {"processed_any", "aggregator"}
+
+    restored = AggregateState("price=avg", sample=0.5)
+    restored.load(data)
+    assert restored.result() == state.result()
+
+
+def test_avg_state_does_not_grow():
+    aggregator = _Avg()
+    for n in range(10_000):
+        aggregator.combine(Decimal(n))
+    assert aggregator.dump() == {"sum": "49995000", "count": 10_000}
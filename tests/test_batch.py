@@ -0,0 +1,188 @@
+"""Тесты для модуля csvtool.batch."""
+import pytest
+
+from csvtool import batch
+from csvtool.aggregators import apply_aggregate
+from csvtool.batch import BatchQuery, QueryError, load_queries, query_columns, run_queries
+from csvtool.filters import apply_where
+
+# ---------------------------------------------------------------------------
+# Данные примеров
+# ---------------------------------------------------------------------------
+
+ROWS = [
+    {"price": "100", "brand": "alpha", "rating": "4.1"},
+    {"price": "200", "brand": "beta", "rating": "4.5"},
+    {"price": "300", "brand": "beta", "rating": "4.9"},
+    {"price": "400", "brand": "alpha", "rating": "3.9"},
+]
+
+
+def _single(query):
+    """Эталон: тот же запрос в обычном режиме."""
+    rows = ROWS
+    for expr in query.where:
+        rows = apply_where(rows, expr)
+    return apply_aggregate(rows, query.aggregate)
+
+
+# ---------------------------------------------------------------------------
+# Выполнение запросов
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 10])
+def test_matches_single_query_mode(batch_size):
+    queries = [
+        BatchQuery("price=avg", where=["brand=beta"]),
+        BatchQuery("rating=max", where=["brand=alpha", "price>150"]),
+        BatchQuery("price=min"),
+        BatchQuery("brand=approx_distinct", where=["price<350"]),
+    ]
+    batches = [ROWS[i : i + batch_size] for i in range(0, len(ROWS), batch_size)]
+    results = run_queries(batches, queries)
+
+    for query, result in zip(queries, results):
+        assert result == {"query": query.name, **_single(query)}
+
+
+def test_shared_predicate_evaluated_once_per_row(monkeypatch):
+    calls = []
+    original = batch.compile_where
+
+    def counting(expr, sample_row):
+        predicate = original(expr, sample_row)
+
+        def wrapped(row):
+            calls.append(expr)
+            return predicate(row)
+
+        return wrapped
+
+    monkeypatch.setattr(batch, "compile_where", counting)
+    queries = [
+        BatchQuery("price=avg", where=["brand=beta"]),
+        BatchQuery("price=max", where=[" brand=beta "]),
+        BatchQuery("rating=min", where=["brand=beta", "price>100"]),
+    ]
+    run_queries([ROWS], queries)
+
+    # brand=beta — один раз на каждую строку; price>100 — только для строк beta
+    assert calls.count("brand=beta") + calls.count(" brand=beta ") == len(ROWS)
+    assert calls.count("price>100") == 2
+
+
+def test_filtered_out_row_of_wrong_type_is_not_evaluated():
+    """Строка, отсеянная ранним условием, не доходит до следующего."""
+    rows = [
+        {"brand": "a", "price": "10"},
+        {"brand": "b", "price": "N/A"},
+        {"brand": "a", "price": "30"},
+    ]
+    queries = [
+        BatchQuery("price=max", where=["brand=a", "price>5"]),
+        BatchQuery("price=min", where=["brand=a"]),
+    ]
+    first, second = run_queries([rows], queries)
+
+    assert first["value"] == "30" and "error" not in first
+    assert second["value"] == "10"
+
+
+def test_type_inferred_from_first_surviving_row():
+    """Тип колонки определяется по первой строке, прошедшей предыдущие условия."""
+    rows = [
+        {"brand": "b", "price": "N/A"},
+        {"brand": "a", "price": "5"},
+        {"brand": "a", "price": "5.0"},
+    ]
+    query = BatchQuery("price=max", where=["brand=a", "price=5"])
+    expected = apply_aggregate(apply_where(apply_where(rows, "brand=a"), "price=5"), "price=max")
+
+    (result,) = run_queries([rows[:1], rows[1:]], [query])
+    assert result == {"query": query.name, **expected}
+
+
+def test_error_is_isolated_per_query():
+    queries = [
+        BatchQuery("price=min", where=["color=red"]),
+        BatchQuery("brand=avg"),
+        BatchQuery("price=max", name="ok"),
+    ]
+    results = run_queries([ROWS], queries)
+
+    assert "Колонка 'color'" in results[0]["error"]
+    assert "числовые колонки" in results[1]["error"]
+    assert results[2] == {"query": "ok", "column": "price", "function": "max", "value": "400"}
+
+
+def test_no_rows():
+    results = run_queries([], [BatchQuery("price=min")])
+    assert "Нет строк" in results[0]["error"]
+
+
+# ---------------------------------------------------------------------------
+# Файл запросов
+# ---------------------------------------------------------------------------
+
+
+def test_load_text_queries(tmp_path):
+    path = tmp_path / "queries.txt"
+    path.write_text(
+        '# отчёт\n\n--name beta --where "brand=beta" --aggregate "price=avg"\n'
+        "--where price>1 --where price<5 --aggregate rating=max --sample 0.5\n",
+        encoding="utf-8",
+    )
+    first, second = load_queries(path)
+
+    assert (first.name, first.where, first.aggregate) == ("beta", ["brand=beta"], "price=avg")
+    assert second.where == ["price>1", "price<5"] and second.sample == 0.5
+    assert second.name == "price>1 price<5 rating=max"
+
+
+def test_load_json_queries(tmp_path):
+    path = tmp_path / "queries.json"
+    path.write_text('[{"aggregate": "price=min", "where": ["brand=beta"]}]', encoding="utf-8")
+    (query,) = load_queries(path)
+    assert query.aggregate == "price=min" and query.where == ["brand=beta"]
+
+
+def test_load_json_queries_optional_fields(tmp_path):
+    path = tmp_path / "queries.json"
+    path.write_text(
+        '[{"aggregate": "price=avg", "where": null, "sample": 1, "name": null}]',
+        encoding="utf-8",
+    )
+    (query,) = load_queries(path)
+    assert query.where == [] and query.sample == 1 and query.name == "price=avg"
+
+
+@pytest.mark.parametrize(
+    "name, content, pattern",
+    [
+        ("q.txt", "--where price>1\n", "ровно один --aggregate"),
+        ("q.txt", "--bogus x --aggregate price=min\n", "неизвестный аргумент"),
+        ("q.txt", "--aggregate\n", "не указано значение"),
+        ("q.txt", "# только комментарий\n", "ни одного запроса"),
+        ("q.json", "[{", "Некорректный JSON"),
+        ("q.json", '{"aggregate": "price=avg"}', "список объектов"),
+        ("q.json", '["price=avg"]', "Запрос 1: ожидается объект"),
+        ("q.json", '[{"where": []}]', "'aggregate' должен быть строкой"),
+        ("q.json", '[{"aggregate": 5}]', "'aggregate' должен быть строкой"),
+        ("q.json", '[{"aggregate": "price=avg", "where": "brand=apple"}]', "'where' должен"),
+        ("q.json", '[{"aggregate": "price=avg", "where": [1]}]', "'where' должен"),
+        ("q.json", '[{"aggregate": "price=avg", "sample": "0.5"}]', "'sample' должен"),
+        ("q.json", '[{"aggregate": "price=avg", "sample": true}]', "'sample' должен"),
+        ("q.json", '[{"aggregate": "price=min"}, {"aggregate": "x", "name": 1}]', "Запрос 2"),
+    ],
+)
+def test_invalid_query_files(tmp_path, name, content, pattern):
+    path = tmp_path / name
+    path.write_text(content, encoding="utf-8")
+    with pytest.raises(QueryError, match=pattern):
+        load_queries(path)
+
+
+def test_query_columns():
+    queries = [BatchQuery("price=avg", where=["brand=beta"]), BatchQuery("price=max")]
+    assert query_columns(queries) == ["brand", "price"]
@@ -25,7 +25,7 @@ def test_success_render_rows(monkeypatch):
     """Без --aggregate выводятся строки (ветка render_rows)."""
 
     # Заглушаем load_csv
-    monkeypatch.setattr(cli, "load_csv", lambda path: SAMPLE_ROWS)
+    monkeypatch.setattr(cli, "load_csv", lambda path, **kwargs: SAMPLE_ROWS)
 
     # Отлавливаем вызов render_rows
     called = {}
@@ -44,7 +44,7 @@ def test_success_render_rows(monkeypatch):
 def test_success_aggregate(monkeypatch):
     """С --aggregate должен вызываться render_aggregate без ошибок."""
 
-    monkeypatch.setattr(cli, "load_csv", lambda path: SAMPLE_ROWS)
+    monkeypatch.setattr(cli, "load_csv", lambda path, **kwargs: SAMPLE_ROWS)
 
     # Используем реальную apply_aggregate, поэтому укажем существующую функцию
 
@@ -68,7 +68,7 @@ def test_success_aggregate(monkeypatch):
 def test_file_not_found(monkeypatch, capsys):
     """FileNotFoundError -> exit code 1."""
 
-    def raise_fn(path):
+    def raise_fn(path, **kwargs):
         raise FileNotFoundError
 
     monkeypatch.setattr(cli, "load_csv", raise_fn)
@@ -84,7 +84,7 @@ def test_file_not_found(monkeypatch, capsys):
 def test_generic_loader_error(monkeypatch, capsys):
     """Любая другая ошибка чтения CSV -> exit code 1."""
 
-    def raise_fn(path):
+    def raise_fn(path, **kwargs):
         raise RuntimeError("boom")
 
     monkeypatch.setattr(cli, "load_csv", raise_fn)
@@ -105,7 +105,7 @@ def test_generic_loader_error(monkeypatch, capsys):
 def test_filter_error(monkeypatch, capsys):
     """apply_where выдаёт ValueError -> exit code 2."""
 
-    monkeypatch.setattr(cli, "load_csv", lambda path: SAMPLE_ROWS)
+    monkeypatch.setattr(cli, "load_csv", lambda path, **kwargs: SAMPLE_ROWS)
 
     def raise_filter(rows, expr):  # noqa: D401, ANN001
         raise ValueError("bad where")
@@ -123,9 +123,9 @@ def test_filter_error(monkeypatch, capsys):
 def test_aggregate_error(monkeypatch, capsys):
     """apply_aggregate выдаёт ValueError -> exit code 2."""
 
-    monkeypatch.setattr(cli, "load_csv", lambda path: SAMPLE_ROWS)
+    monkeypatch.setattr(cli, "load_csv", lambda path, **kwargs: SAMPLE_ROWS)
 
-    def raise_agg(rows, expr):  # noqa: D401, ANN001
+    def raise_agg(rows, expr, **kwargs):  # noqa: D401, ANN001
         raise ValueError("bad agg")
 
     monkeypatch.setattr(cli, "apply_aggregate", raise_agg)
@@ -136,3 +136,160 @@ def test_aggregate_error(monkeypatch, capsys):
     assert exc.value.code == 2
     err = capsys.readouterr().err
     assert "Ошибка агрегации" in err
+
+
+# ---------------------------------------------------------------------------
+# Инкрементальный режим
+# ---------------------------------------------------------------------------
+
+
+def test_incremental_state(tmp_path, monkeypatch):
+    """--state: второй запуск учитывает только дописанные строки."""
+    csv_path = tmp_path / "log.csv"
+    csv_path.write_text("price\n100\n", encoding="utf-8")
+    state = tmp_path / "state.json"
+
+    captured = []
+    monkeypatch.setattr(cli, "render_aggregate", captured.append)
+
+    cli.main([str(csv_path), "--aggregate", "price=max", "--state", str(state)])
+    with csv_path.open("a", encoding="utf-8") as fh:
+        fh.write("300\n")
+    cli.main([str(csv_path), "--aggregate", "price=max", "--state", str(state)])
+
+    assert [r["value"] for r in captured] == ["100", "300"]
+
+
+def test_incremental_requires_aggregate(capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(["file.csv", "--follow"])
+
+    assert exc.value.code == 2
+    assert "требуют --aggregate" in capsys.readouterr().err
+
+
+def test_follow_missing_file(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.main([str(tmp_path / "nope.csv"), "--aggregate", "price=max", "--follow"])
+
+    assert exc.value.code == 1
+    assert "Файл не найден" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("interval", ["0", "-1"])
+def test_follow_rejects_non_positive_interval(interval, capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(["file.csv", "--aggregate", "price=max", "--follow", "--interval", interval])
+
+    assert exc.value.code == 2
+    assert "--interval" in capsys.readouterr().err
+
+
+# ---------------------------------------------------------------------------
+# Объединение файлов
+# ---------------------------------------------------------------------------
+
+
+def test_join_before_filter(tmp_path, monkeypatch):
+    """--join выполняется до --where, колонки второго файла доступны в фильтре."""
+    other = tmp_path / "stock.csv"
+    other.write_text("brand,qty\nalpha,0\nbeta,3\n", encoding="utf-8")
+    monkeypatch.setattr(cli, "load_csv", lambda path, **kwargs: SAMPLE_ROWS)
+
+    called = {}
+    monkeypatch.setattr(cli, "render_rows", lambda rows: called.setdefault("rows", rows))
+
+    cli.main(["file.csv", "--join", str(other), "--on", "brand", "--where", "qty>0"])
+
+    assert called["rows"] == [{"price": "200", "brand": "beta", "qty": "3"}]
+
+
+def test_join_requires_on(capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(["file.csv", "--join", "other.csv"])
+
+    assert exc.value.code == 2
+    assert "--join и --on" in capsys.readouterr().err
+
+
+def test_aggregate_reads_only_needed_columns(monkeypatch):
+    """При агрегации без --join загружаются только колонки из выражений."""
+    captured = {}
+
+    def fake_load(path, columns=None):
+        captured["columns"] = columns
+        return SAMPLE_ROWS
+
+    monkeypatch.setattr(cli, "load_csv", fake_load)
+    monkeypatch.setattr(cli, "render_aggregate", lambda result: None)
+
+    cli.main(["file.csv", "--where", "brand=beta", "--aggregate", "price=max"])
+
+    assert captured["columns"] == ["brand", "price"]
+
+
+# ---------------------------------------------------------------------------
+# Конвейерный режим
+# ---------------------------------------------------------------------------
+
+
+def test_pipeline_aggregate(tmp_path, monkeypatch):
+    """--pipeline даёт тот же результат, что и обычный режим."""
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text("price,brand\n100,alpha\n200,beta\n300,beta\n", encoding="utf-8")
+
+    captured = []
+    monkeypatch.setattr(cli, "render_aggregate", captured.append)
+
+    argv = [str(csv_path), "--where", "brand=beta", "--aggregate", "price=avg"]
+    cli.main(argv)
+    cli.main(argv + ["--pipeline"])
+
+    assert captured[0] == captured[1]
+    assert captured[1]["value"] == "250"
+
+
+# ---------------------------------------------------------------------------
+# Пакетный режим
+# ---------------------------------------------------------------------------
+
+
+def test_queries_single_scan(tmp_path, monkeypatch):
+    """--queries выполняет все запросы и выводит результат по каждому."""
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text("price,brand\n100,alpha\n200,beta\n300,beta\n", encoding="utf-8")
+    queries = tmp_path / "queries.txt"
+    queries.write_text(
+        '--where "brand=beta" --aggregate "price=avg"\n--aggregate "price=min"\n',
+        encoding="utf-8",
+    )
+
+    captured = {}
+    monkeypatch.setattr(cli, "render_queries", lambda results: captured.setdefault("r", results))
+
+    cli.main([str(csv_path), "--queries", str(queries)])
+
+    assert [r["value"] for r in captured["r"]] == ["250", "100"]
+
+
+def test_queries_conflicts_with_aggregate(capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(["file.csv", "--queries", "q.txt", "--aggregate", "price=min"])
+
+    assert exc.value.code == 2
+    assert "--queries нельзя сочетать" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["file.csv", "--sample", "0.5"],
+        ["file.csv", "--queries", "q.txt", "--sample", "0.5"],
+    ],
+)
+def test_sample_requires_aggregate(argv, capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(argv)
+
+    assert exc.value.code == 2
+    assert "--sample используется только вместе с --aggregate" in capsys.readouterr().err
@@ -4,7 +4,7 @@ from decimal import Decimal
 import pytest
 
 from csvtool import filters
-from csvtool.filters import apply_where
+from csvtool.filters import apply_where, WhereFilter
 
 # ---------------------------------------------------------------------------
 # Данные примеров
@@ -75,4 +75,42 @@ def test_unknown_operator_branch():
     """Обходим регэксп и вызываем _make_comparator напрямую."""
     comp = filters._make_comparator("^", "123")  # op '^' недопустим
     with pytest.raises(ValueError, match="Неизвестный оператор"):
-        comp("1", "2")
\ No newline at end of file
+        comp("1", "2")
+
+# ---------------------------------------------------------------------------
+# WhereFilter — потоковая фильтрация пачками
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "batches",
+    [
+        [[{"price": "N/A"}], [{"price": "5"}, {"price": "5.0"}]],
+        [[{"price": "5"}], [{"price": "N/A"}, {"price": "5.0"}]],
+    ],
+)
+def test_where_filter_matches_apply_where(batches):
+    """Тип колонки определяется один раз, как при фильтрации всех строк сразу."""
+    rows = [row for batch in batches for row in batch]
+    where = WhereFilter(["price=5"])
+    try:
+        expected = apply_where(rows, "price=5")
+    except ValueError as exc:
+        with pytest.raises(ValueError, match=str(exc)):
+            for batch in batches:
+                where.apply(batch)
+    else:
+        assert [row for batch in batches for row in where.apply(batch)] == expected
+
+
+def test_where_filter_type_from_first_surviving_row():
+    """Второе условие определяет тип по первой строке, прошедшей первое."""
+    rows = [{"brand": "b", "price": "N/A"}, {"brand": "a", "price": "10"}]
+    where = WhereFilter(["brand=a", "price>5"])
+    assert where.apply(rows) == [rows[1]]
+    assert where.samples == ["b", "10"]
+
+
+def test_where_filter_restored_samples():
+    where = WhereFilter(["price=5"], samples=["N/A"])
+    assert where.apply([{"price": "5"}, {"price": "5.0"}]) == [{"price": "5"}]
@@ -0,0 +1,234 @@
+"""Тесты для модуля csvtool.follow."""
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+from csvtool.aggregators import AggregationError
+from csvtool.follow import IncrementalAggregate, watch
+
+# ---------------------------------------------------------------------------
+# Вспомогательные функции
+# ---------------------------------------------------------------------------
+
+
+def _write(path, text, mode="w"):
+    with open(path, mode, encoding="utf-8", newline="") as fh:
+        fh.write(text)
+
+
+@pytest.fixture
+def log_csv(tmp_path):
+    path = tmp_path / "log.csv"
+    _write(path, "name,price\na,10\nb,20\n")
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Инкрементальное чтение
+# ---------------------------------------------------------------------------
+
+
+def test_reads_only_appended_rows(log_csv):
+    tracker = IncrementalAggregate(log_csv, None, "price=max")
+    assert tracker.poll() == 2
+    _write(log_csv, "c,30\n", "a")
+    assert tracker.poll() == 1
+    assert tracker.poll() == 0
+    assert tracker.result()["value"] == "30"
+    assert tracker.rescans == 0
+
+
+def test_partial_line_is_deferred(log_csv):
+    tracker = IncrementalAggregate(log_csv, None, "price=max")
+    tracker.poll()
+    _write(log_csv, "c,9", "a")
+    assert tracker.poll() == 0
+    _write(log_csv, "99\n", "a")
+    assert tracker.poll() == 1
+    assert tracker.result()["value"] == "999"
+
+
+def test_quoted_newline_split_across_polls(tmp_path):
+    """Запись с переводом строки в кавычках ждёт закрывающей кавычки."""
+    path = tmp_path / "log.csv"
+    _write(path, "name,note,price\na,-,10\n")
+    tracker = IncrementalAggregate(path, None, "price=max")
+    tracker.poll()
+    _write(path, 'x,"line1\n', "a")
+    assert tracker.poll() == 0
+    _write(path, 'line2",70\n', "a")
+    assert tracker.poll() == 1
+    assert tracker.result()["value"] == "70"
+
+
+def test_streams_small_blocks(tmp_path, monkeypatch):
+    """Файл читается блоками; записи с кавычками на стыке блоков не теряются."""
+    monkeypatch.setattr("csvtool.loader._BLOCK_SIZE", 7)
+    path = tmp_path / "log.csv"
+    _write(path, "name,note,price\n" + "".join(f'r{i},"a,\nb",{i}\n' for i in range(50)))
+    tracker = IncrementalAggregate(path, ["price>10"], "price=avg")
+    assert tracker.poll() == 50
+    _write(path, 'x,"c\n', "a")
+    assert tracker.poll() == 0
+    _write(path, 'd",100\n', "a")
+    assert tracker.poll() == 1
+    assert tracker.result()["value"] == str((sum(range(11, 50)) + 100) / Decimal(40))
+    assert tracker._offset == path.stat().st_size
+
+
+def test_failed_update_keeps_offset(log_csv):
+    tracker = IncrementalAggregate(log_csv, None, "price=max")
+    tracker.poll()
+    _write(log_csv, "c,99\nd,abc\n", "a")
+    with pytest.raises(AggregationError):
+        tracker.poll()
+    # Ни одна строка из неудачной порции не учтена
+    assert tracker.result()["value"] == "20"
+    assert tracker._offset == len("name,price\na,10\nb,20\n")
+
+
+def test_where_type_fixed_across_polls(log_csv):
+    """Тип колонки в --where определяется один раз, а не в каждой порции."""
+    _write(log_csv, "name,price\nc,N/A\n")
+    tracker = IncrementalAggregate(log_csv, ["price=5"], "name=approx_distinct")
+    tracker.poll()
+    _write(log_csv, "d,5\ne,5.0\n", "a")
+    tracker.poll()
+    # Колонка строковая (по первой строке 'N/A'): '5.0' не равно '5'
+    assert tracker.result()["value"] == "1"
+
+
+def test_where_applied_to_new_rows(log_csv):
+    tracker = IncrementalAggregate(log_csv, ["name=b"], "price=avg")
+    tracker.poll()
+    _write(log_csv, "a,100\nb,40\n", "a")
+    tracker.poll()
+    assert tracker.result()["value"] == "30"
+
+
+# ---------------------------------------------------------------------------
+# Сохранение состояния между запусками
+# ---------------------------------------------------------------------------
+
+
+def test_state_roundtrip(log_csv, tmp_path):
+    state = tmp_path / "state.json"
+    first = IncrementalAggregate.load(state, log_csv, None, "price=avg")
+    first.poll()
+    first.save(state)
+
+    _write(log_csv, "c,60\n", "a")
+    second = IncrementalAggregate.load(state, log_csv, None, "price=avg")
+    assert second.poll() == 1
+    assert second.result()["value"] == "30"
+
+
+def test_state_is_compact_json(log_csv, tmp_path):
+    """Состояние avg хранит сумму и количество, а не все значения."""
+    _write(log_csv, "".join(f"r{i},{i}\n" for i in range(5_000)), "a")
+    state = tmp_path / "state.json"
+    tracker = IncrementalAggregate(log_csv, ["price>0"], "price=avg")
+    tracker.poll()
+    tracker.save(state)
+
+    payload = json.loads(state.read_text(encoding="utf-8"))
+    assert payload["state"]["aggregator"] == {"sum": "12497530", "count": 5001}
+    assert payload["where_samples"] == ["10"]
+    assert state.stat().st_size < 1_000
+
+
+def test_state_for_other_query_is_ignored(log_csv, tmp_path):
+    state = tmp_path / "state.json"
+    first = IncrementalAggregate.load(state, log_csv, None, "price=avg")
+    first.poll()
+    first.save(state)
+
+    other = IncrementalAggregate.load(state, log_csv, None, "price=min")
+    assert other.poll() == 2
+
+
+def test_corrupted_state_falls_back(log_csv, tmp_path):
+    state = tmp_path / "state.json"
+    state.write_text('{"version": 2, "key": []', encoding="utf-8")
+    tracker = IncrementalAggregate.load(state, log_csv, None, "price=min")
+    assert tracker.poll() == 2
+    assert tracker.result()["value"] == "10"
+
+
+# ---------------------------------------------------------------------------
+# Усечение и ротация
+# ---------------------------------------------------------------------------
+
+
+def test_truncation_triggers_rescan(log_csv):
+    tracker = IncrementalAggregate(log_csv, None, "price=max")
+    tracker.poll()
+    _write(log_csv, "name,price\nz,5\n")
+    assert tracker.poll() == 1
+    assert tracker.rescans == 1
+    assert tracker.result()["value"] == "5"
+
+
+def test_rotation_same_size_triggers_rescan(log_csv, tmp_path):
+    tracker = IncrementalAggregate(log_csv, None, "price=max")
+    tracker.poll()
+    rotated = tmp_path / "new.csv"
+    _write(rotated, "name,price\nx,70\ny,80\n")
+    os.replace(rotated, log_csv)
+    assert tracker.poll() == 2
+    assert tracker.rescans == 1
+    assert tracker.result()["value"] == "80"
+
+
+# ---------------------------------------------------------------------------
+# Ошибки и режим наблюдения
+# ---------------------------------------------------------------------------
+
+
+def test_missing_file(tmp_path):
+    tracker = IncrementalAggregate(tmp_path / "nope.csv", None, "price=max")
+    with pytest.raises(FileNotFoundError):
+        tracker.poll()
+
+
+def test_missing_file_never_seen_is_error_when_watching(tmp_path):
+    tracker = IncrementalAggregate(tmp_path / "nope.csv", None, "price=max")
+    with pytest.raises(FileNotFoundError):
+        watch(tracker, print, interval=0, max_polls=3)
+
+
+def test_header_only_file(tmp_path):
+    path = tmp_path / "empty.csv"
+    _write(path, "name,price\n")
+    tracker = IncrementalAggregate(path, None, "price=max")
+    assert tracker.poll() == 0
+    assert tracker.empty
+
+
+def test_watch_emits_only_on_changes(log_csv, tmp_path, monkeypatch):
+    results = []
+    monkeypatch.setattr("csvtool.follow.time.sleep", lambda _: _write(log_csv, "c,50\n", "a"))
+    tracker = IncrementalAggregate(log_csv, None, "price=max")
+    state = tmp_path / "state.json"
+    watch(tracker, results.append, interval=0, state_path=state, max_polls=2)
+    assert [r["value"] for r in results] == ["20", "50"]
+    assert state.exists()
+
+
+def test_watch_survives_rename_rotation(log_csv, tmp_path, monkeypatch):
+    """mv log log.1 и создание нового log: цикл не падает и пересчитывает файл."""
+    steps = iter(
+        [
+            lambda: os.replace(log_csv, tmp_path / "log.csv.1"),
+            lambda: None,  # новый файл появляется не сразу
+            lambda: _write(log_csv, "name,price\nn,5\n"),
+        ]
+    )
+    monkeypatch.setattr("csvtool.follow.time.sleep", lambda _: next(steps)())
+    results = []
+    tracker = IncrementalAggregate(log_csv, None, "price=max")
+    watch(tracker, results.append, interval=0, max_polls=4)
+    assert [r["value"] for r in results] == ["20", "5"]
+    assert tracker.rescans == 1
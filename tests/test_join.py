@@ -0,0 +1,121 @@
+"""Тесты для модуля csvtool.join."""
+import pytest
+
+from csvtool import join
+from csvtool.join import apply_join, JoinError
+
+# ---------------------------------------------------------------------------
+# Данные примеров
+# ---------------------------------------------------------------------------
+
+ROWS = [
+    {"sku": "1", "name": "Alpha", "price": "100"},
+    {"sku": "2", "name": "Beta", "price": "200"},
+    {"sku": "3", "name": "Gamma", "price": "300"},
+]
+
+
+@pytest.fixture
+def stock_csv(tmp_path):
+    path = tmp_path / "stock.csv"
+    path.write_text("sku,qty,price\n1,5,90\n3,0,310\n3,7,305\n4,1,1\n", encoding="utf-8")
+    return path
+
+
+def _sorted(rows):
+    return sorted(rows, key=lambda r: sorted(r.items()))
+
+
+# ---------------------------------------------------------------------------
+# Позитивные сценарии
+# ---------------------------------------------------------------------------
+
+
+def test_inner_join(stock_csv):
+    result = apply_join(ROWS, stock_csv, "sku")
+    assert _sorted(result) == _sorted(
+        [
+            {"sku": "1", "name": "Alpha", "price": "100", "qty": "5", "price_stock": "90"},
+            {"sku": "3", "name": "Gamma", "price": "300", "qty": "0", "price_stock": "310"},
+            {"sku": "3", "name": "Gamma", "price": "300", "qty": "7", "price_stock": "305"},
+        ]
+    )
+
+
+@pytest.mark.parametrize("limit", [1, join._DEFAULT_MEMORY_LIMIT])
+@pytest.mark.parametrize("n_rows", [20, 2_000])
+def test_keeps_main_file_order(tmp_path, limit, n_rows):
+    """Порядок основного файла сохраняется при любой стороне хэш‑таблицы и при сбросе."""
+    other = tmp_path / "other.csv"
+    other.write_text(
+        "key,v\n" + "".join(f"{i % 13},{i}\n" for i in range(100)), encoding="utf-8"
+    )
+    rows = [{"key": str((i * 7) % 13), "n": str(i)} for i in range(n_rows)]
+
+    result = apply_join(rows, other, "key", memory_limit=limit)
+    assert [(r["n"], r["v"]) for r in result] == [
+        (row["n"], str(v)) for row in rows for v in range(100) if v % 13 == int(row["key"])
+    ]
+    assert all(join._ORDER not in r for r in result)
+
+
+def test_build_side_does_not_change_result(stock_csv):
+    """Хэш‑таблица по любому из входов даёт одинаковые строки."""
+    small = apply_join(ROWS[:1], stock_csv, "sku")
+    big = apply_join(ROWS[:1] * 50, stock_csv, "sku")
+    assert small and big
+    assert all(row == small[0] for row in big)
+
+
+@pytest.mark.parametrize("limit", [1, 500])
+def test_spill_matches_in_memory(tmp_path, limit):
+    """Grace hash join при малом бюджете памяти совпадает с обычным."""
+    other = tmp_path / "other.csv"
+    other.write_text(
+        "key,v\n" + "".join(f"{i % 97},{i}\n" for i in range(1_000)), encoding="utf-8"
+    )
+    rows = [{"key": str(i), "w": str(i * 2)} for i in range(200)]
+
+    expected = apply_join(rows, other, "key")
+    spilled = apply_join(rows, other, "key", memory_limit=limit)
+    assert len(expected) == 1_000
+    assert _sorted(spilled) == _sorted(expected)
+
+
+def test_spill_uses_temp_files(tmp_path, monkeypatch):
+    calls = []
+    original = join._grace_join
+
+    def spy(*args, **kwargs):
+        calls.append(args[5])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(join, "_grace_join", spy)
+    other = tmp_path / "other.csv"
+    other.write_text("key,v\n1,a\n2,b\n", encoding="utf-8")
+    apply_join([{"key": "1"}, {"key": "2"}], other, "key", memory_limit=1)
+    assert calls and calls[0] == 0
+
+
+def test_empty_rows(stock_csv):
+    assert apply_join([], stock_csv, "sku") == []
+
+
+# ---------------------------------------------------------------------------
+# Отрицательные сценарии
+# ---------------------------------------------------------------------------
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        apply_join(ROWS, tmp_path / "nope.csv", "sku")
+
+
+def test_key_missing_in_rows(stock_csv):
+    with pytest.raises(JoinError, match="Колонка 'qty'"):
+        apply_join(ROWS, stock_csv, "qty")
+
+
+def test_key_missing_in_other(stock_csv):
+    with pytest.raises(JoinError, match="stock.csv"):
+        apply_join(ROWS, stock_csv, "name")
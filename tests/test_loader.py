@@ -0,0 +1,118 @@
+"""Тесты для модуля csvtool.loader."""
+import csv
+
+import pytest
+
+from csvtool import loader
+from csvtool.loader import load_csv, CSVLoaderError
+
+# ---------------------------------------------------------------------------
+# Данные примеров
+# ---------------------------------------------------------------------------
+
+SIMPLE_FILES = [
+    "name,price\na,1\nb,2\n",
+    "name,price\r\na,1\r\nb,2",  # CRLF и нет перевода строки в конце
+    "name,price\na,1\n\nb,2\n\n",  # пустые строки пропускаются
+    "name,price\na\nb,2,extra,more\n",  # короче и длиннее заголовка
+    "\ufeffцена,бренд\n10,эппл\n",  # BOM и не‑ASCII
+]
+
+QUOTED_FILES = [
+    'name,price\n"a, b",1\n',
+    'name,note\nx,"line1\nline2"\n',
+    "name,price\ra,1\r",  # одиночный \r как перевод строки
+    "\nname,price\na,1\n",  # пустая первая строка
+]
+
+
+@pytest.fixture(params=[1, 5, 1 << 20], ids=["block1", "block5", "block1M"])
+def block_size(request, monkeypatch):
+    """Прогоняем быстрый путь с разными размерами блока."""
+    monkeypatch.setattr(loader, "_BLOCK_SIZE", request.param)
+    return request.param
+
+
+def _write(tmp_path, text, name="data.csv"):
+    path = tmp_path / name
+    path.write_bytes(text.encode("utf-8"))
+    return path
+
+
+def _reference(path, columns=None):
+    """Эталон: чтение модулем csv целиком."""
+    with path.open(newline="", encoding="utf-8") as fh:
+        reader = csv.DictReader(fh)
+        rows = list(reader)
+    if columns is None:
+        return rows
+    wanted = [name for name in columns if name in reader.fieldnames]
+    return [{name: row[name] for name in wanted} for row in rows]
+
+
+def _forbid_general(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("ожидался быстрый путь")
+
+    monkeypatch.setattr(loader, "_parse_general", fail)
+
+
+# ---------------------------------------------------------------------------
+# Быстрый путь и модуль csv дают одинаковый результат
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("text", SIMPLE_FILES + QUOTED_FILES)
+@pytest.mark.parametrize("columns", [None, ["price", "missing"]])
+def test_fast_path_matches_csv_module(tmp_path, block_size, text, columns):
+    path = _write(tmp_path, text)
+    assert load_csv(path, columns=columns) == _reference(path, columns)
+
+
+def test_switch_to_csv_module_mid_file(tmp_path, block_size):
+    """Кавычки в середине файла: начало разобрано быстрым путём, остаток — csv."""
+    text = "name,price\n" + "a,1\n" * 20 + '"b, c",2\nd,3\n'
+    path = _write(tmp_path, text)
+    assert load_csv(path) == _reference(path)
+
+
+@pytest.mark.parametrize("text", SIMPLE_FILES)
+def test_simple_files_use_fast_path(tmp_path, monkeypatch, text):
+    path = _write(tmp_path, text)
+    _forbid_general(monkeypatch)
+    assert load_csv(path) == _reference(path)
+
+
+@pytest.mark.parametrize("text", QUOTED_FILES)
+def test_quoted_files_fall_back(tmp_path, monkeypatch, text):
+    path = _write(tmp_path, text)
+    _forbid_general(monkeypatch)
+    with pytest.raises(AssertionError, match="быстрый путь"):
+        load_csv(path)
+
+
+def test_columns_projection(tmp_path):
+    path = _write(tmp_path, "name,brand,price\na,x,1\nb,y,2\n")
+    assert load_csv(path, columns=["price"]) == [{"price": "1"}, {"price": "2"}]
+
+
+def test_utf16_uses_csv_module(tmp_path):
+    path = tmp_path / "utf16.csv"
+    path.write_bytes("name,price\na,1\n".encode("utf-16"))
+    assert load_csv(path, encoding="utf-16") == [{"name": "a", "price": "1"}]
+
+
+# ---------------------------------------------------------------------------
+# Ошибки
+# ---------------------------------------------------------------------------
+
+
+def test_file_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_csv(tmp_path / "nope.csv")
+
+
+def test_empty_file(tmp_path):
+    path = _write(tmp_path, "")
+    with pytest.raises(CSVLoaderError, match="без заголовка"):
+        load_csv(path)
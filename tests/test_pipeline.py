@@ -0,0 +1,112 @@
+"""Тесты для модуля csvtool.pipeline."""
+import threading
+
+import pytest
+
+from csvtool import loader, pipeline
+from csvtool.loader import load_csv, CSVLoaderError
+from csvtool.filters import apply_where
+from csvtool.pipeline import iter_batches, filter_batches
+
+# ---------------------------------------------------------------------------
+# Вспомогательные функции
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def big_csv(tmp_path, monkeypatch):
+    """Файл из множества маленьких блоков, чтобы задействовать очереди."""
+    monkeypatch.setattr(loader, "_BLOCK_SIZE", 64)
+    path = tmp_path / "big.csv"
+    lines = "".join(f"item{i},{i % 10},{i}\n" for i in range(2_000))
+    path.write_text("name,group,price\n" + lines, encoding="utf-8")
+    return path
+
+
+def _flatten(batches):
+    return [row for batch in batches for row in batch]
+
+
+def _stage_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("csvtool-")]
+
+
+# ---------------------------------------------------------------------------
+# Позитивные сценарии
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("queue_size", [1, 4])
+def test_matches_load_csv(big_csv, queue_size):
+    assert _flatten(iter_batches(big_csv, queue_size=queue_size)) == load_csv(big_csv)
+
+
+def test_columns_projection(big_csv):
+    rows = _flatten(iter_batches(big_csv, columns=["price"]))
+    assert rows == load_csv(big_csv, columns=["price"])
+
+
+def test_quoted_file(tmp_path):
+    path = tmp_path / "quoted.csv"
+    path.write_text('name,price\n"a, b",1\nc,2\n', encoding="utf-8")
+    assert _flatten(iter_batches(path)) == load_csv(path)
+
+
+def test_filter_batches(big_csv):
+    rows = _flatten(filter_batches(iter_batches(big_csv), ["group=3", "price>1000"]))
+    assert rows and all(r["group"] == "3" and int(r["price"]) > 1000 for r in rows)
+
+
+def test_early_exit_stops_stages(big_csv):
+    """Прерванный потребитель не оставляет висящих потоков."""
+    batches = iter_batches(big_csv, queue_size=1)
+    next(batches)
+    batches.close()
+    assert not _stage_threads()
+
+
+# ---------------------------------------------------------------------------
+# Ошибки
+# ---------------------------------------------------------------------------
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        next(iter_batches(tmp_path / "nope.csv"))
+
+
+def test_parser_error_is_propagated(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("", encoding="utf-8")
+    with pytest.raises(CSVLoaderError, match="без заголовка"):
+        _flatten(iter_batches(path))
+    assert not _stage_threads()
+
+
+def test_reader_error_is_propagated(big_csv, monkeypatch):
+    def broken(fh):
+        yield fh.read(10)
+        raise OSError("disk gone")
+
+    monkeypatch.setattr(pipeline, "_read_blocks", broken)
+    with pytest.raises(OSError, match="disk gone"):
+        _flatten(iter_batches(big_csv))
+
+
+@pytest.mark.parametrize(
+    "batches",
+    [
+        [[{"price": "N/A"}], [{"price": "5"}, {"price": "5.0"}]],
+        [[{"price": "1"}], [{"price": "x"}, {"price": "3"}]],
+    ],
+)
+def test_filter_batches_matches_apply_where(batches):
+    """Тип колонки не переопределяется в каждой пачке."""
+    rows = [row for batch in batches for row in batch]
+    try:
+        expected = apply_where(rows, "price=5")
+    except ValueError:
+        with pytest.raises(ValueError, match="Несовместимые типы"):
+            _flatten(filter_batches(batches, ["price=5"]))
+    else:
+        assert _flatten(filter_batches(batches, ["price=5"])) == expected
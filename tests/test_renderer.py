@@ -39,3 +39,20 @@ def test_render_aggregate(capsys):
     renderer.render_aggregate(result)
     out = capsys.readouterr().out
     assert "price" in out and "max" in out and "200" in out
+
+
+def test_render_aggregate_with_ci(capsys):
+    result = {"column": "price", "function": "avg", "value": "150", "ci95": "±12.5"}
+    renderer.render_aggregate(result)
+    out = capsys.readouterr().out
+    assert "ci95" in out and "±12.5" in out
+
+
+def test_render_queries(capsys):
+    results = [
+        {"query": "q1", "column": "price", "function": "max", "value": "200"},
+        {"query": "q2", "error": "Колонка 'x' не найдена в CSV."},
+    ]
+    renderer.render_queries(results)
+    out = capsys.readouterr().out
+    assert "q1" in out and "200" in out and "error" in out and "Колонка 'x'" in out